@@ -0,0 +1,74 @@
+import os
+
+from storage import account_key
+
+TAIL_SIZE = 64
+
+
+def is_account_line(line):
+    line = line.strip()
+    return bool(line) and not line.startswith(b"#")
+
+
+def shard_of(account, count):
+    return int(account_key(account)[:8], 16) % count
+
+
+class AccountSource:
+    def __init__(self, path, shard=None):
+        self.path = path
+        # (index, count): only the accounts that hash to this shard
+        self.shard = shard
+        self.count = 0
+        self.offset = 0
+        self.mtime = None
+        self.size = None
+        self._tail = b""
+
+    def refresh(self):
+        stat = os.stat(self.path)
+        if stat.st_mtime_ns == self.mtime and stat.st_size == self.size:
+            return 0
+
+        appended = self.mtime is not None and stat.st_size > self.offset and self._tail_unchanged()
+        if not appended:
+            self.count = 0
+            self.offset = 0
+
+        added = 0
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            for line in file:
+                if self._wanted(line):
+                    added += 1
+            self.offset = file.tell()
+            file.seek(max(0, self.offset - TAIL_SIZE))
+            self._tail = file.read(TAIL_SIZE)
+
+        self.count += added
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        return added
+
+    def _wanted(self, line):
+        if not is_account_line(line):
+            return False
+        return self.shard is None or shard_of(line.strip().decode(), self.shard[1]) == self.shard[0]
+
+    def _tail_unchanged(self):
+        # lines were only appended if the bytes before the old end still match
+        with open(self.path, "rb") as file:
+            file.seek(max(0, self.offset - TAIL_SIZE))
+            return file.read(len(self._tail)) == self._tail
+
+    def __aiter__(self):
+        return self.accounts()
+
+    async def accounts(self):
+        with open(self.path, "rb") as file:
+            while file.tell() < self.offset:
+                line = file.readline()
+                if not line:
+                    break
+                if self._wanted(line):
+                    yield line.strip().decode()
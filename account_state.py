@@ -0,0 +1,41 @@
+class AccountState:
+    def __init__(self, request, session, auth_headers):
+        self.request = request
+        self.session = session
+        self.auth_headers = auth_headers
+        self.status = {}
+        self.fetched = 0
+        self.saved = 0
+        self._cache = {}
+
+    async def get(self, endpoint):
+        if endpoint in self._cache:
+            self.saved += 1
+            return self._cache[endpoint]
+
+        status, data = await self.request(self.session, "GET", endpoint, headers=self.auth_headers)
+        self.fetched += 1
+        self.status[endpoint] = status
+        if status != 200:
+            return None
+
+        self._cache[endpoint] = data
+        return data
+
+    def invalidate(self, *endpoints):
+        if not endpoints:
+            self._cache.clear()
+        for endpoint in endpoints:
+            self._cache.pop(endpoint, None)
+
+    def set_auth_headers(self, auth_headers):
+        self.auth_headers = auth_headers
+        self.invalidate()
+
+    async def profile(self):
+        data = await self.get("/user/profile")
+        return data.get("data", {}) if data else None
+
+    async def mining(self):
+        data = await self.get("/user/mining")
+        return data.get("data", {}) if data else None
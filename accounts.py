@@ -0,0 +1,38 @@
+import sys
+
+from storage import account_key
+
+
+class Account:
+    # one small fixed-layout record per account instead of a dict, pools of 100k accounts stay cheap
+    __slots__ = ("init_data", "key", "seen_at", "balance", "spins")
+
+    def __init__(self, init_data):
+        self.init_data = init_data
+        # interned so every store keyed by it shares this one string
+        self.key = sys.intern(account_key(init_data))
+        # end of the previous visit, the wake planner estimates income and spin refills from it
+        self.seen_at = None
+        self.balance = None
+        self.spins = 0
+
+
+class AccountRegistry:
+    def __init__(self, source):
+        self.source = source
+        self.accounts = {}
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        # the same Account is handed out for a line on every pass, accounts gone from data.txt are dropped
+        current = {}
+        async for init_data in self.source:
+            account = self.accounts.get(init_data) or Account(init_data)
+            current[account.init_data] = account
+            yield account
+        self.accounts = current
@@ -0,0 +1,185 @@
+"""Drive BeeHarvestBot against the local mock API and report throughput and latency.
+
+Run from the repository root: python -m benchmarks.bench_e2e --accounts 200 --latency 0.02
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from loguru import logger
+
+import json_backend
+from benchmarks.mock_server import MockBeeHarvest, add_arguments, config_from_args
+from config import HTTP_CONFIG
+from main import BeeHarvestBot
+from metrics import endpoint_name
+from scheduler import DeadlineScheduler
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(int)
+
+    def wrap(self, session_manager):
+        # every request goes through the transport, so timing it there works for any backend
+        request = session_manager.request
+
+        async def timed(session, method, endpoint, headers=None, payload=None):
+            started = time.perf_counter()
+            response = await request(session, method, endpoint, headers=headers, payload=payload)
+            self.latencies[endpoint_name(method, endpoint)].append(time.perf_counter() - started)
+            self.statuses[response.status] += 1
+            return response
+
+        session_manager.request = timed
+
+    @property
+    def requests(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    def reset(self):
+        self.latencies.clear()
+        self.statuses.clear()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_mock(config, port, ready, http2=False):
+    async def serve():
+        server = MockBeeHarvest(config)
+        if http2:
+            await server.start_http2("127.0.0.1", port)
+        else:
+            await server.start("127.0.0.1", port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def run_cycle(bot, workers):
+    # a fresh deadline scheduler has every account due at once, the last visit stops it so the
+    # cycle ends when each account was processed once; the wake planner still runs on every visit
+    scheduler = DeadlineScheduler(None, workers, key=lambda account: account.key)
+    remaining = await scheduler.sync(bot.account_registry)
+    if not remaining:
+        return scheduler.stats
+
+    async def visit(account):
+        nonlocal remaining
+        try:
+            return await bot.process_account(account)
+        finally:
+            remaining -= 1
+            if not remaining:
+                scheduler.stop()
+
+    scheduler.handler = visit
+    return await scheduler.run(time.time() + 86400)
+
+
+def print_report(cycles, recorder):
+    print(f"\n{'cycle':>5} {'accounts':>9} {'wall s':>8} {'requests':>9} {'req/s':>8} {'acc/min':>9} "
+          f"{'decode ms':>10} {'% wall':>7} {'% cpu':>6}")
+    for index, (stats, requests, decode, cpu) in enumerate(cycles, 1):
+        print(f"{index:>5} {stats.processed:>9} {stats.wall_time:>8.2f} {requests:>9} "
+              f"{requests / stats.wall_time if stats.wall_time else 0:>8.1f} {stats.accounts_per_minute:>9.1f} "
+              f"{decode * 1000:>10.1f} {decode / stats.wall_time * 100 if stats.wall_time else 0:>7.2f} "
+              f"{decode / cpu * 100 if cpu else 0:>6.2f}")
+    print(f"JSON backend: {json_backend.backend}, transport: {HTTP_CONFIG.get('transport', 'aiohttp')}")
+
+    print(f"\n{'endpoint':<42} {'count':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, values in sorted(recorder.latencies.items(), key=lambda item: -len(item[1])):
+        print(f"{name:<42} {len(values):>7} {percentile(values, 0.5) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}")
+    print(f"\nstatus codes: {dict(sorted(recorder.statuses.items()))}")
+
+
+async def run_benchmark(args, base_url, workdir):
+    accounts_file = os.path.join(workdir, "data.txt")
+    with open(accounts_file, "w") as file:
+        for i in range(args.accounts):
+            file.write(f"query_id=bench{i}&user=%7B%22id%22%3A{1000 + i}%7D&auth_date=1700000000&hash=bench{i}\n")
+
+    HTTP_CONFIG["transport"] = args.transport
+    bot = BeeHarvestBot(base_url=base_url, accounts_file=accounts_file, database=os.path.join(workdir, "bench.db"))
+    bot.rate_budget.rate = args.rps
+    recorder = LatencyRecorder()
+    recorder.wrap(bot.session_manager)
+
+    cycles = []
+    async with bot.session_manager:
+        for _ in range(args.cycles):
+            bot.account_source.refresh()
+            bot.metrics.start_cycle()
+            before = recorder.requests
+            cpu = time.process_time()
+            stats = await run_cycle(bot, args.workers)
+            cycles.append((stats, recorder.requests - before, bot.metrics.cycle_decode_seconds, time.process_time() - cpu))
+
+    print_report(cycles, recorder)
+    print(f"connections: {bot.session_manager.stats}")
+    if args.metrics_file:
+        bot.metrics.write(args.metrics_file, "prometheus" if args.metrics_file.endswith(".prom") else "json")
+    return bot, cycles, recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end BeeHarvestBot benchmark against a local mock API")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--cycles", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--rps", type=float, default=0, help="per-host request budget, 0 = unlimited")
+    parser.add_argument("--url", help="benchmark an already running mock server instead of starting one")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's own log output")
+    parser.add_argument("--metrics-file", help="also dump the bot's own metrics (.json or .prom)")
+    parser.add_argument("--json-backend", choices=sorted(json_backend.DECODERS), help="default: fastest installed")
+    parser.add_argument("--transport", choices=("aiohttp", "httpx"), default="aiohttp", help="httpx multiplexes over HTTP/2")
+    parser.add_argument("--http2-server", action="store_true", help="serve the mock through hypercorn, which also speaks h2c")
+    add_arguments(parser)
+    args = parser.parse_args()
+    json_backend.use(args.json_backend)
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="ERROR")
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve_mock, args=(config_from_args(args), port, ready, args.http2_server), daemon=True)
+        server.start()
+        if not ready.wait(10):
+            raise SystemExit("mock server did not start")
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            asyncio.run(run_benchmark(args, base_url, workdir))
+    finally:
+        if server:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
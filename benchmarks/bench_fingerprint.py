@@ -0,0 +1,85 @@
+"""Compare EndpointMonitor fingerprinting against the old string-building version.
+
+Run from the repository root: python -m benchmarks.bench_fingerprint
+"""
+import argparse
+import hashlib
+import json
+import random
+import timeit
+import tracemalloc
+
+from main import EndpointMonitor
+
+
+def legacy_structure(obj):
+    if isinstance(obj, dict):
+        return '{' + ','.join(sorted(f'{k}:{legacy_structure(v)}' for k, v in obj.items())) + '}'
+    elif isinstance(obj, list) and obj:
+        return '[' + legacy_structure(obj[0]) + ']'
+    else:
+        return 'value'
+
+
+def task_payload(count):
+    return {"message": "ok", "data": [{
+        "id": i,
+        "title": f"Task {i}",
+        "type": random.choice(["tg", "other"]),
+        "ended": False,
+        "reward": {"amount": i * 10, "currency": "honey", "bonus": {"multiplier": 1.5, "expires": None}},
+        "criterions": [{"type": "transfer", "description": json.dumps({"to": "addr", "amount": i})}]
+    } for i in range(count)]}
+
+
+def wide_payload(count):
+    return {"message": "ok", "data": {f"field_{i}": {"value": i, "meta": {"a": 1, "b": [1, 2]}} for i in range(count)}}
+
+
+def deep_payload(depth):
+    node = {"leaf": 1}
+    for i in range(depth):
+        node = {f"level_{i}": node, "items": [{"id": i, "tags": ["a", "b"]}]}
+    return {"data": node}
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = {
+        "tasks 1k": json.dumps(task_payload(1000)),
+        "wide 2k": json.dumps(wide_payload(2000)),
+        "deep 40": json.dumps(deep_payload(40)),
+    }
+    monitor = EndpointMonitor()
+    shallow_monitor = EndpointMonitor(max_depth=4)
+
+    def per_call(total):
+        return total * 1000 / args.repeat
+
+    print(f"{'payload':<12} {'bytes':>8} {'parse ms':>9} {'legacy ms':>10} {'streamed ms':>12} "
+          f"{'depth 4 ms':>11} {'legacy KB':>10} {'streamed KB':>12}")
+    for name, content in payloads.items():
+        data = json.loads(content)
+        parse = timeit.timeit(lambda: json.loads(content), number=args.repeat)
+        legacy_walk = lambda: hashlib.md5(f"200:{legacy_structure(data)}".encode()).hexdigest()
+        streamed_walk = lambda: monitor._structure_signature(200, data)
+        legacy = timeit.timeit(legacy_walk, number=args.repeat)
+        streamed = timeit.timeit(streamed_walk, number=args.repeat)
+        shallow = timeit.timeit(lambda: shallow_monitor._structure_signature(200, data), number=args.repeat)
+        print(f"{name:<12} {len(content):>8} {per_call(parse):>9.3f} {per_call(legacy):>10.3f} {per_call(streamed):>12.3f} "
+              f"{per_call(shallow):>11.3f} {peak_kb(legacy_walk):>10.1f} {peak_kb(streamed_walk):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
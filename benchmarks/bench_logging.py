@@ -0,0 +1,112 @@
+"""Compare the old synchronous log sinks with the queued ones from logs.py.
+
+Run from the repository root: python -m benchmarks.bench_logging --events 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from colorama import Fore, Style
+from loguru import logger
+
+from logs import setup_logging
+from metrics import current_account
+
+
+class SlowConsole:
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        # a terminal or a pipe to a slow reader blocks the writer for a moment on every write
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def legacy_logging(log_file, prefix="", quiet=False, json_file=None):
+    # the sinks main.py used before logs.py: written in the caller, console through print
+    logger.remove()
+    logger.add(
+        log_file,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+        rotation="1 day",
+        retention="7 days",
+        level="INFO"
+    )
+    logger.add(
+        lambda msg: print(msg, end=""),
+        colorize=True,
+        format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <white>{message}</white>",
+        level="INFO"
+    )
+
+
+async def emit(events, accounts):
+    lag = 0.0
+
+    async def ticker():
+        # how late a 1ms sleep wakes up is how long logging kept the loop busy
+        nonlocal lag
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - started - 0.001)
+
+    async def account(index):
+        current_account.set(f"bench{index:07d}")
+        for i in range(events // accounts):
+            logger.info(f"{Fore.GREEN}[Task] {i}: Task completed{Style.RESET_ALL}")
+            if i % 20 == 0:
+                await asyncio.sleep(0)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(account(index) for index in range(accounts)))
+    emitted = time.perf_counter() - started
+    tick.cancel()
+    return emitted, lag
+
+
+def run(name, configure, args, workdir):
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = SlowConsole(devnull, args.console_delay / 1e6)
+        try:
+            configure(os.path.join(workdir, f"{name}.log"), quiet="quiet" in name,
+                      json_file=os.path.join(workdir, f"{name}.jsonl") if "json" in name else None)
+            started = time.perf_counter()
+            emitted, lag = asyncio.run(emit(args.events, args.accounts))
+            # removing the sinks waits for the queued records to be written
+            logger.remove()
+            total = time.perf_counter() - started
+        finally:
+            sys.stdout = stdout
+    print(f"{name:<28} {args.events / emitted:>12.0f} {args.events / total:>12.0f} {lag * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log events per second, old sinks against queued sinks")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--console-delay", type=float, default=0, help="microseconds every console write takes")
+    args = parser.parse_args()
+
+    print(f"{'sinks':<28} {'emit ev/s':>12} {'written ev/s':>12} {'max lag ms':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        run("legacy", legacy_logging, args, workdir)
+        run("queued", setup_logging, args, workdir)
+        run("queued quiet", setup_logging, args, workdir)
+        run("queued quiet json", setup_logging, args, workdir)
+
+
+if __name__ == "__main__":
+    main()
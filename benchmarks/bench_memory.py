@@ -0,0 +1,151 @@
+"""Bytes of long-lived state per account, the layout before the account registry against the current one.
+
+Run from the repository root: python -m benchmarks.bench_memory --accounts 10000 100000
+"""
+import argparse
+import asyncio
+import gc
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import aiohttp
+
+from account_source import AccountSource
+from accounts import AccountRegistry
+from main import BeeHarvestBot
+from scheduler import DeadlineScheduler
+from storage import ActionStore, TokenStore, account_key
+
+
+def fake_init_data(index):
+    # about the size of a real Telegram WebApp init string
+    user = f"%7B%22id%22%3A{7000000000 + index}%2C%22first_name%22%3A%22Bee{index}%22%2C%22username%22%3A%22bee{index}%22%2C%22language_code%22%3A%22en%22%7D"
+    return f"query_id=AAH{index:012d}&user={user}&auth_date=1716000000&hash={hashlib.sha256(str(index).encode()).hexdigest()}"
+
+
+def fake_token(index):
+    return f"eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJ1c2VyXyVkIiwiZXhwIjo{index:016d}fQ.{hashlib.sha1(str(index).encode()).hexdigest()}"
+
+
+def prepare(workdir, count, tasks):
+    data_file = os.path.join(workdir, f"data{count}.txt")
+    database = os.path.join(workdir, f"state{count}.db")
+    with open(data_file, "w") as file:
+        for index in range(count):
+            file.write(fake_init_data(index) + "\n")
+
+    # let the stores create their tables, then fill them the way a pool looks after a few days
+    TokenStore(database).close()
+    ActionStore(database).close()
+    conn = sqlite3.connect(database)
+    expires = time.time() + 86400
+    conn.executemany("INSERT INTO tokens VALUES (?, ?, ?)",
+                     ((account_key(fake_init_data(index)), fake_token(index), expires) for index in range(count)))
+    actions = ["streak", "join_squad/2637", "stake"] + [f"task/{task}" for task in range(tasks)]
+    conn.executemany("INSERT INTO account_actions VALUES (?, ?, ?, ?)",
+                     ((account_key(fake_init_data(index)), action, expires, None)
+                      for index in range(count) for action in actions))
+    conn.commit()
+    conn.close()
+    return data_file, database
+
+
+async def legacy_state(data_file, database):
+    # what main.py kept before the registry: raw lines, a fresh key string per store row, tuples per account
+    conn = sqlite3.connect(database)
+    tokens = {
+        key: (token, expires_at)
+        for key, token, expires_at in conn.execute("SELECT account_key, token, expires_at FROM tokens")
+    }
+    actions = {
+        (key, action): next_at
+        for key, action, next_at in conn.execute("SELECT account_key, action, next_at FROM account_actions")
+    }
+    conn.close()
+
+    source = AccountSource(data_file)
+    source.refresh()
+    scheduler = DeadlineScheduler(None, key=account_key)
+    await scheduler.sync(source)
+    last = {}
+    for account in scheduler.accounts:
+        last[account_key(account)] = (time.time(), 0.0, 0)
+    return tokens, actions, scheduler, last
+
+
+async def registry_state(data_file, database):
+    tokens = TokenStore(database)
+    actions = ActionStore(database)
+    source = AccountSource(data_file)
+    source.refresh()
+    registry = AccountRegistry(source)
+    scheduler = DeadlineScheduler(None, key=lambda account: account.key)
+    await scheduler.sync(registry)
+    for account in scheduler.accounts:
+        account.seen_at, account.balance, account.spins = time.time(), 0.0, 0
+    return tokens, actions, registry, scheduler
+
+
+def measure(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    state = asyncio.run(build(*args))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del state
+    gc.collect()
+    return used
+
+
+def bytes_each(build, count=1000):
+    # the results are kept alive until measured, single objects would come out of freelists
+    tracemalloc.start()
+    built = [build() for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used // count, built
+
+
+async def header_bytes(default_headers):
+    # what aiohttp itself allocates: a session copies its default headers into a CIMultiDict, and
+    # _prepare_headers merges every request's headers into a fresh copy of those defaults
+    authorization = {"Authorization": f"Bearer {fake_token(1)}"}
+    plain = aiohttp.ClientSession()
+    shared = aiohttp.ClientSession(headers=default_headers)
+    sizes = {}
+    sizes["request before"], _ = bytes_each(lambda: plain._prepare_headers({**default_headers, **authorization}))
+    sizes["request now"], _ = bytes_each(lambda: shared._prepare_headers(authorization))
+    sizes["session before"], sessions = bytes_each(aiohttp.ClientSession, 100)
+    sizes["session now"], more = bytes_each(lambda: aiohttp.ClientSession(headers=default_headers), 100)
+    for session in [plain, shared] + sessions + more:
+        await session.close()
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per account, loose strings and dicts against the account registry")
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--tasks", type=int, default=18, help="completed tasks remembered per account")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'accounts':>10} {'layout':<10} {'total MB':>10} {'bytes/account':>14}")
+        for count in args.accounts:
+            data_file, database = prepare(workdir, count, args.tasks)
+            for name, build in (("legacy", legacy_state), ("registry", registry_state)):
+                used = measure(build, data_file, database)
+                print(f"{count:>10} {name:<10} {used / 1e6:>10.1f} {used / count:>14.0f}")
+
+        bot = BeeHarvestBot(accounts_file=os.path.join(workdir, "data.txt"), database=os.path.join(workdir, "bot.db"))
+        headers = asyncio.run(header_bytes(bot.default_headers))
+        print(f"headers per session: {headers['session before']} bytes before, {headers['session now']} bytes with the defaults on it")
+        print(f"headers per request: {headers['request before']} bytes before, {headers['request now']} bytes with the defaults on the session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""Local stand-in for api.beeharvest.life.
+
+Run from the repository root: python -m benchmarks.mock_server --port 8080 --latency 0.05
+Add --http2 to serve HTTP/1.1 and HTTP/2 (h2c) through hypercorn instead of aiohttp.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+BOOST_TYPES = ("honey", "bee", "beehive", "farmer")
+BOOST_BASE_COST = {"honey": 100, "bee": 500, "beehive": 2000, "farmer": 5000}
+BOOST_BASE_YIELD = {"honey": 1, "bee": 4, "beehive": 12, "farmer": 25}
+SPIN_BATCHES = (1, 3, 5, 10)
+ROUTES = (
+    ("POST", "/auth/validate", "auth_validate"),
+    ("GET", "/user/profile", "profile"),
+    ("GET", "/user/mining", "mining"),
+    ("POST", "/user/streak/claim", "streak_claim"),
+    ("GET", "/spinner/spin", "spin_info"),
+    ("POST", "/spinner/spin", "spin"),
+    ("GET", "/combo_game/current", "combo_current"),
+    ("POST", "/combo_game/check_combo", "combo_check"),
+    ("POST", "/user/boost/{boost}/next_level", "boost"),
+    ("GET", "/tasks/user", "tasks"),
+    ("POST", "/tasks/check_tg_task/{task_id}", "check_task"),
+    ("POST", "/token_pool/", "stake"),
+    ("POST", "/user/join_squad/{squad_id}", "join_squad"),
+    ("POST", "/squads/donate_pool/{squad_id}", "donate")
+)
+
+
+class MockConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, tasks=20, combo_items=12,
+                 spins=7, balance=25000.0, token_ttl=3600, day_length=86400, rate_limit=0, income=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tasks = tasks
+        self.combo_items = combo_items
+        self.spins = spins
+        self.balance = balance
+        self.token_ttl = token_ttl
+        self.day_length = day_length
+        self.rate_limit = rate_limit
+        self.income = income
+
+
+class MockAccount:
+    def __init__(self, init_data, config):
+        self.username = "user_" + hashlib.sha1(init_data.encode()).hexdigest()[:8]
+        self.balance = config.balance
+        self.spins = config.spins
+        self.squad_id = None
+        self.streak_claimed = False
+        self.combo_played = False
+        self.levels = {boost: 1 for boost in BOOST_TYPES}
+        self.completed_tasks = set()
+        self.staked = 0.0
+        self.day = None
+        self.mined_at = time.time()
+
+    def mine(self, income):
+        # the mining levels pay `income` tokens per yield point every second
+        now = time.time()
+        self.balance += sum(boost_yield(boost, level) for boost, level in self.levels.items()) * income * (now - self.mined_at)
+        self.mined_at = now
+
+    def roll_day(self, day_length):
+        day = int(time.time() // day_length)
+        if day != self.day:
+            self.day = day
+            self.streak_claimed = False
+            self.combo_played = False
+
+
+def boost_cost(boost, level):
+    return round(BOOST_BASE_COST[boost] * 1.5 ** (level - 1), 2)
+
+
+def boost_yield(boost, level):
+    return round(BOOST_BASE_YIELD[boost] * level, 2)
+
+
+def make_token(subject, ttl):
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+    payload = {"sub": subject, "exp": int(time.time() + ttl), "nonce": random.getrandbits(32)}
+    return f"{encode({'alg': 'none'})}.{encode(payload)}.mock"
+
+
+class MockBeeHarvest:
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.accounts = {}
+        self.tokens = {}
+        self.hits = Counter()
+        self.throttled = 0
+        self.window = (0, 0)
+        self.app = web.Application(middlewares=[self.middleware])
+        for method, path, name in ROUTES:
+            self.app.router.add_route(method, path, getattr(self, name))
+        self.server = None
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = request.match_info.route.resource
+        return await self.gate(request.method, route.canonical if route else request.path) or await handler(request)
+
+    async def gate(self, method, route):
+        # counting, rate limit, latency and injected errors, shared by the aiohttp and the ASGI front
+        self.hits[f"{method} {route}"] += 1
+
+        if self.config.rate_limit:
+            second = int(time.time())
+            count = self.window[1] + 1 if self.window[0] == second else 1
+            self.window = (second, count)
+            if count > self.config.rate_limit:
+                self.throttled += 1
+                return web.json_response({"message": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < self.config.error_rate:
+            return reply(None, "Internal server error", 500)
+        return None
+
+    def account(self, request):
+        header = request.headers.get("Authorization", "")
+        entry = self.tokens.get(header[7:]) if header.startswith("Bearer ") else None
+        if not entry or entry[1] < time.time():
+            raise web.HTTPUnauthorized(text=json.dumps({"message": "Unauthorized"}), content_type="application/json")
+        account = self.accounts[entry[0]]
+        account.roll_day(self.config.day_length)
+        account.mine(self.config.income)
+        return account
+
+    async def auth_validate(self, request):
+        init_data = (await request.json()).get("hash")
+        if not init_data:
+            return reply(None, "Invalid hash", 400)
+        if init_data not in self.accounts:
+            self.accounts[init_data] = MockAccount(init_data, self.config)
+        token = make_token(self.accounts[init_data].username, self.config.token_ttl)
+        self.tokens[token] = (init_data, time.time() + self.config.token_ttl)
+        return reply({"token": token})
+
+    async def profile(self, request):
+        account = self.account(request)
+        return reply({
+            "tg_username": account.username,
+            "balance": round(account.balance, 5),
+            "squad_id": account.squad_id,
+            "staked": account.staked
+        })
+
+    async def mining(self, request):
+        account = self.account(request)
+        return reply({
+            boost: {
+                "level": level,
+                "yield": boost_yield(boost, level),
+                "next_level_price": boost_cost(boost, level + 1),
+                "next_level_yield": boost_yield(boost, level + 1)
+            }
+            for boost, level in account.levels.items()
+        })
+
+    async def streak_claim(self, request):
+        account = self.account(request)
+        if account.streak_claimed:
+            return reply(None, "Streak already claimed today", 400)
+        account.streak_claimed = True
+        account.balance += 500
+        return reply({"reward": 500}, "Streak claimed")
+
+    async def spin_info(self, request):
+        account = self.account(request)
+        return reply({"spin_count": account.spins})
+
+    async def spin(self, request):
+        account = self.account(request)
+        count = (await request.json()).get("spin_count", 0)
+        if count not in SPIN_BATCHES:
+            return reply(None, "Invalid spin count", 400)
+        if count > account.spins:
+            return reply(None, "Not enough spins", 400)
+        account.spins -= count
+        rewards = [{"type": random.choice(["honey", "token", "spin"]), "value": random.randint(1, 100), "count": 1}
+                   for _ in range(count)]
+        account.balance += sum(reward["value"] for reward in rewards if reward["type"] == "token")
+        return reply(rewards)
+
+    async def combo_current(self, request):
+        self.account(request)
+        return reply({"items": [{"id": i, "name": f"Item {i}"} for i in range(1, self.config.combo_items + 1)]})
+
+    async def combo_check(self, request):
+        account = self.account(request)
+        if account.combo_played:
+            return reply(None, "Combo already played today", 400)
+        account.combo_played = True
+        return reply({"reward": 100}, "Combo checked")
+
+    async def boost(self, request):
+        account = self.account(request)
+        boost = request.match_info["boost"]
+        if boost not in account.levels:
+            return reply(None, "Unknown boost", 404)
+        level = account.levels[boost]
+        cost = boost_cost(boost, level + 1)
+        if account.balance < cost:
+            return reply(None, "Insufficient balance", 400)
+        account.balance -= cost
+        account.levels[boost] = level + 1
+        return web.json_response({
+            "message": "Upgraded",
+            "data": {"level": level, "yield": boost_yield(boost, level)},
+            "current": {"level": level + 1, "yield": boost_yield(boost, level + 1), "price": cost,
+                        "next_level_price": boost_cost(boost, level + 2)}
+        })
+
+    async def tasks(self, request):
+        self.account(request)
+        return reply([{
+            "id": task_id,
+            "title": f"Task {task_id}",
+            "type": "other" if task_id % 5 == 0 else "telegram",
+            "ended": task_id % 7 == 0,
+            "reward": 100 + task_id,
+            "criterions": [{"type": "transfer", "description": json.dumps({"amount": 1})}] if task_id % 5 == 0 else []
+        } for task_id in range(1, self.config.tasks + 1)])
+
+    async def check_task(self, request):
+        account = self.account(request)
+        task_id = int(request.match_info["task_id"])
+        if task_id in account.completed_tasks:
+            return reply(None, "Task already completed", 400)
+        account.completed_tasks.add(task_id)
+        account.balance += 100 + task_id
+        return reply({"task_id": task_id}, "Task completed")
+
+    async def stake(self, request):
+        account = self.account(request)
+        amount = float((await request.json()).get("amount", 0))
+        if account.squad_id is None:
+            return reply(None, "Join a squad first", 400)
+        if amount <= 0 or amount > account.balance + 1e-9:
+            return reply(None, "Invalid amount", 400)
+        account.balance -= amount
+        account.staked += amount
+        return reply({"staked": account.staked}, "Staked")
+
+    async def join_squad(self, request):
+        account = self.account(request)
+        squad_id = int(request.match_info["squad_id"])
+        if account.squad_id == squad_id:
+            return reply(None, "Already joined this squad", 400)
+        account.squad_id = squad_id
+        return reply({"squad_id": squad_id}, "Joined squad")
+
+    async def donate(self, request):
+        account = self.account(request)
+        amount = float((await request.json()).get("amount", 0))
+        if amount > account.balance:
+            return reply(None, "Insufficient balance", 400)
+        account.balance -= amount
+        return reply(None, "Donated")
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        return self.runner
+
+    async def start_http2(self, host="127.0.0.1", port=8080):
+        # hypercorn speaks HTTP/1.1 and h2c on the same port, so both transports can be compared on one server
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"{host}:{port}"]
+        config.accesslog = None
+        config.errorlog = None
+        # the real API keeps connections open, hypercorn would send GOAWAY after 1000 requests
+        config.keep_alive_max_requests = 10 ** 9
+        self.server = asyncio.Event()
+        started = asyncio.Event()
+        asyncio.ensure_future(serve(AsgiApp(self, started), config, shutdown_trigger=self.server.wait))
+        await started.wait()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.set()
+        else:
+            await self.runner.cleanup()
+
+
+class AsgiRequest:
+    # the few parts of an aiohttp request the handlers use
+    def __init__(self, scope, body, match_info):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = CIMultiDict((name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"])
+        self.match_info = match_info
+        self.body = body
+
+    async def json(self):
+        return json.loads(self.body)
+
+
+class AsgiApp:
+    def __init__(self, mock, started=None):
+        self.mock = mock
+        self.started = started
+        self.routes = [
+            (method, re.compile("^" + re.sub(r"\\{(\w+)\\}", r"(?P<\1>[^/]+)", re.escape(path)) + "$"), path, getattr(mock, name))
+            for method, path, name in ROUTES
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                    if self.started:
+                        self.started.set()
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        response = await self.respond(scope, body)
+        headers = [(name.lower().encode(), value.encode()) for name, value in response.headers.items()]
+        await send({"type": "http.response.start", "status": response.status, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def respond(self, scope, body):
+        for method, pattern, path, handler in self.routes:
+            match = pattern.match(scope["path"])
+            if match and method == scope["method"]:
+                break
+        else:
+            return reply(None, "Not found", 404)
+
+        try:
+            return await self.mock.gate(method, path) or await handler(AsgiRequest(scope, body, match.groupdict()))
+        except web.HTTPException as e:
+            return web.Response(status=e.status, text=e.text, content_type="application/json")
+
+
+def reply(data, message="OK", status=200):
+    return web.json_response({"message": message, "data": data}, status=status)
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--tasks", type=int, default=20, help="tasks returned by /tasks/user")
+    parser.add_argument("--spins", type=int, default=7, help="spins each new account starts with")
+    parser.add_argument("--balance", type=float, default=25000.0, help="balance each new account starts with")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before answering 429, 0 = off")
+    parser.add_argument("--income", type=float, default=0.0, help="tokens mined per yield point per second")
+    parser.add_argument("--day-length", type=float, default=86400, help="seconds before daily rewards reset")
+
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      tasks=args.tasks, spins=args.spins, balance=args.balance, day_length=args.day_length,
+                      rate_limit=args.rate_limit, income=args.income)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the BeeHarvest API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--http2", action="store_true", help="serve through hypercorn, HTTP/1.1 and h2c on one port")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    async def serve():
+        server = MockBeeHarvest(config_from_args(args))
+        if args.http2:
+            await server.start_http2(args.host, args.port)
+        else:
+            await server.start(args.host, args.port)
+        print(f"Mock BeeHarvest API listening on http://{args.host}:{args.port}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
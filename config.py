@@ -25,4 +25,89 @@ MINING_CONFIG = {
     }
 }
 
-UPGRADE_SEQUENCE = ["farmer", "beehive", "bee", "honey"]
\ No newline at end of file
+UPGRADE_SEQUENCE = ["farmer", "beehive", "bee", "honey"]
+
+UPGRADE_CONFIG = {
+    "probe_margin": 2 # an upgrade with an unknown price that was refused is tried again once the balance is this many times larger
+}
+
+# Spins
+SPIN_CONFIG = {
+    "batch_sizes": [10, 5, 3, 1] # spins per request, sizes the server refuses are dropped for the rest of the run
+}
+
+# Account scheduler
+SCHEDULER_CONFIG = {
+    "workers": 5, # accounts processed at the same time
+    "requests_per_second": 0, # request budget per host, 0 = only slow down when the server pushes back
+    "burst": 5, # requests allowed back to back before the budget kicks in
+    "min_requests_per_second": 0.5, # floor when the server pushes back with 429/5xx
+    "min_interval": 60, # seconds before an account is visited again at the earliest
+    "max_interval": 1800, # seconds before an account is visited again at the latest
+    "report_interval": 600, # seconds between cycle reports and data.txt checks
+    "shutdown_grace": 30 # seconds accounts in flight get to finish on Ctrl+C/SIGTERM before they are checkpointed
+}
+
+# Shared HTTP connection pool
+HTTP_CONFIG = {
+    "limit": 100, # open connections in total
+    "limit_per_host": 20, # open connections to the API host
+    "keepalive_timeout": 60, # seconds an idle connection is kept for reuse
+    "dns_cache_ttl": 300, # seconds a resolved address is cached
+    "transport": "aiohttp" # "aiohttp" (HTTP/1.1) or "httpx" (HTTP/2, needs: pip install "httpx[http2]")
+}
+
+# Local storage
+STORAGE_CONFIG = {
+    "database": "beeharvest.db" # tokens and account state are kept here between runs
+}
+
+# Daily and one-time actions
+STATE_CONFIG = {
+    "daily_reset_hour": 0, # UTC hour the daily streak can be claimed again
+    "donate_interval": 600 # seconds between two squad pool donations of the same account
+}
+
+# Tasks
+TASK_CONFIG = {
+    "concurrency": 4, # task checks in flight per account
+    "catalog_ttl": 600 # seconds the task list is shared between accounts before it is fetched again
+}
+
+# Staking
+STAKE_CONFIG = {
+    "min_amount": 1000, # balance an account has to reach before it is staked, 0 = stake any balance
+    "min_interval": 3600 # seconds between two stakes of the same account
+}
+
+# Auth token cache
+TOKEN_CONFIG = {
+    "default_ttl": 3600, # seconds a token is reused when it carries no expiry
+    "expiry_margin": 60 # re-authenticate this many seconds before expiry
+}
+
+# API change detection
+MONITOR_CONFIG = {
+    "max_depth": 32 # nesting depth fingerprinted per response
+}
+
+# Logging
+LOGGING_CONFIG = {
+    "file": "beeharvest.log", # human readable log, rotated daily
+    "json_file": "beeharvest.jsonl", # one JSON object per event with the account it belongs to, rotated daily, empty to disable
+    "quiet": False # plain console output without colors, same as --quiet
+}
+
+# Request metrics
+METRICS_CONFIG = {
+    "file": "metrics.json", # written after every cycle, empty to disable
+    "format": "json", # "json" or "prometheus"
+    "port": 0 # serve /metrics on this localhost port, 0 = disabled
+}
+
+# Retries for failed requests (GETs, and any request answered with 429)
+RETRY_CONFIG = {
+    "attempts": 3, # retries after the first try
+    "base_delay": 0.5, # seconds, doubled on every retry with random jitter
+    "max_delay": 30 # longest wait between two retries
+}
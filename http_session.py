@@ -0,0 +1,201 @@
+import asyncio
+import ssl
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    @property
+    def reuse_ratio(self):
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.reuse_ratio, 4),
+            "dns_hits": self.dns_hits,
+            "dns_misses": self.dns_misses
+        }
+
+    def trace_config(self):
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_misses += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def __str__(self):
+        return (f"{self.requests} requests over {self.connections_created} new connections, "
+                f"{self.connections_reused} reused ({self.reuse_ratio:.1%}), "
+                f"DNS cache {self.dns_hits} hits / {self.dns_misses} misses")
+
+
+class Response:
+    __slots__ = ("status", "headers", "body", "charset")
+
+    def __init__(self, status, headers, body, charset):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+
+
+class SessionManager:
+    # aiohttp over HTTP/1.1, one pooled connector shared by every account
+    errors = (aiohttp.ClientError, asyncio.TimeoutError)
+
+    def __init__(self, base_url, config, trace_configs=None, headers=None):
+        self.base_url = base_url
+        self.config = config
+        # default headers for every session, the dict is shared but aiohttp copies it per session and per request
+        self.headers = headers
+        self.stats = ConnectionStats()
+        self.trace_configs = [self.stats.trace_config()] + list(trace_configs or [])
+        self.connector = None
+        self._ssl_context = None
+
+    async def start(self):
+        if self.connector is not None and not self.connector.closed:
+            return
+        # one context for every connection, the CA store is loaded once; asyncio never passes an SSLSession,
+        # so TLS handshakes are not resumed and connection reuse is what saves them
+        self._ssl_context = ssl.create_default_context()
+        self.connector = aiohttp.TCPConnector(
+            limit=self.config["limit"],
+            limit_per_host=self.config["limit_per_host"],
+            keepalive_timeout=self.config["keepalive_timeout"],
+            ttl_dns_cache=self.config["dns_cache_ttl"],
+            use_dns_cache=True,
+            ssl=self._ssl_context
+        )
+
+    def session(self):
+        # every account gets its own cookie jar on top of the shared pool
+        return aiohttp.ClientSession(
+            base_url=self.base_url,
+            connector=self.connector,
+            connector_owner=False,
+            cookie_jar=aiohttp.CookieJar(),
+            headers=self.headers,
+            trace_configs=self.trace_configs
+        )
+
+    async def request(self, session, method, endpoint, headers=None, payload=None):
+        async with session.request(method, endpoint, headers=headers, json=payload) as response:
+            return Response(response.status, response.headers, await response.read(), response.charset)
+
+    async def close(self):
+        if self.connector is not None and not self.connector.closed:
+            await self.connector.close()
+        self.connector = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class HttpxSessionManager:
+    # httpx with h2: requests of all accounts are multiplexed as streams over a few connections
+    errors = (httpx.HTTPError, asyncio.TimeoutError) if httpx else ()
+
+    def __init__(self, base_url, config, headers=None):
+        if httpx is None:
+            raise RuntimeError('the httpx transport needs: pip install "httpx[http2]"')
+        self.base_url = base_url
+        self.config = config
+        self.headers = headers
+        self.stats = ConnectionStats()
+        self.transport = None
+        self._extensions = {"trace": self._trace}
+
+    async def _trace(self, event, info):
+        if event == "connection.connect_tcp.complete":
+            self.stats.connections_created += 1
+
+    async def start(self):
+        if self.transport is not None:
+            return
+        # plain http has no ALPN to negotiate h2, so local servers are spoken to with prior knowledge
+        cleartext = self.base_url.startswith("http://")
+        self.transport = httpx.AsyncHTTPTransport(
+            http1=not cleartext,
+            http2=True,
+            verify=ssl.create_default_context(),
+            limits=httpx.Limits(
+                max_connections=self.config["limit"],
+                max_keepalive_connections=self.config["limit_per_host"],
+                keepalive_expiry=self.config["keepalive_timeout"]
+            )
+        )
+
+    @asynccontextmanager
+    async def session(self):
+        # an account's client only holds its cookies, it is not closed since that would close the shared pool
+        yield httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            transport=self.transport,
+            # aiohttp's defaults, httpx would otherwise give up after 5 seconds
+            timeout=httpx.Timeout(300, connect=30)
+        )
+
+    async def request(self, session, method, endpoint, headers=None, payload=None):
+        self.stats.requests += 1
+        response = await session.request(method, endpoint, headers=headers, json=payload, extensions=self._extensions)
+        # streams that did not need a connection of their own count as reuse, like aiohttp's pooled requests
+        self.stats.connections_reused = self.stats.requests - self.stats.connections_created
+        return Response(response.status_code, response.headers, response.content, response.charset_encoding)
+
+    async def close(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+        self.transport = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+def session_manager(base_url, config, headers=None):
+    if config.get("transport", "aiohttp") == "httpx":
+        return HttpxSessionManager(base_url, config, headers)
+    return SessionManager(base_url, config, headers=headers)
@@ -0,0 +1,36 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# every backend raises a ValueError subclass on bad input, callers catch that
+DECODERS = {"json": json.loads}
+if ujson:
+    DECODERS["ujson"] = ujson.loads
+if orjson:
+    DECODERS["orjson"] = orjson.loads
+
+backend = None
+loads = None
+
+
+def use(name=None):
+    # fastest installed backend unless one is asked for by name
+    global backend, loads
+    if name is None:
+        name = next(candidate for candidate in ("orjson", "ujson", "json") if candidate in DECODERS)
+    if name not in DECODERS:
+        raise ValueError(f"JSON backend {name} is not installed")
+    backend = name
+    loads = DECODERS[name]
+    return backend
+
+
+use()
@@ -0,0 +1,125 @@
+import glob
+import json
+import os
+import queue
+import re
+import sys
+import threading
+from datetime import date, timedelta
+
+from loguru import logger
+
+from metrics import current_account
+
+ANSI_CODES = re.compile(r"\x1b\[[0-9;]*m")
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {extra[plain]}"
+CONSOLE_FORMAT = "<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | {prefix}<white>{message}</white>"
+QUIET_FORMAT = "{time:HH:mm:ss} | {level: <8} | {prefix}{extra[plain]}"
+
+
+def patch_record(record):
+    # runs once per event for all sinks: colorama codes stripped once, account taken from the running task
+    record["extra"]["plain"] = ANSI_CODES.sub("", record["message"])
+    record["extra"]["account"] = current_account.get()
+
+
+class QueuedWriter:
+    def __init__(self, stream, batch_size=512):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, message):
+        self.queue.put(message)
+
+    def _run(self):
+        # everything waiting is joined into one write, the event loop never touches the file
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            lines = [self.format(message) for message in batch if message is not None]
+            if lines:
+                self.stream.write("".join(lines))
+                self.stream.flush()
+            if done:
+                return
+
+    def format(self, message):
+        return message
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+        if hasattr(self.stream, "close") and self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+
+class JsonLinesWriter(QueuedWriter):
+    def format(self, message):
+        record = message.record
+        return json.dumps({
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "account": record["extra"].get("account"),
+            "event": record["function"],
+            "message": record["extra"]["plain"]
+        }) + "\n"
+
+
+class DailyFile:
+    def __init__(self, path, retention_days=7):
+        self.path = path
+        self.retention_days = retention_days
+        self.day = None
+        self.file = None
+
+    def write(self, text):
+        today = date.today()
+        if today != self.day:
+            self._rotate(today)
+        self.file.write(text)
+
+    def _rotate(self, today):
+        base, ext = os.path.splitext(self.path)
+        if self.file:
+            self.file.close()
+        # a file left over from an earlier day is archived under the day it was last written
+        if os.path.exists(self.path):
+            written = self.day or date.fromtimestamp(os.path.getmtime(self.path))
+            if written != today:
+                os.replace(self.path, f"{base}.{written.isoformat()}{ext}")
+        oldest = (today - timedelta(days=self.retention_days)).isoformat()
+        for archived in glob.glob(f"{glob.escape(base)}.????-??-??{ext}"):
+            if archived[len(base) + 1:len(base) + 11] < oldest:
+                os.remove(archived)
+        self.day = today
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def setup_logging(log_file="beeharvest.log", prefix="", quiet=False, json_file=None, level="INFO"):
+    # formats are plain strings so loguru compiles them once, writes happen on a background thread
+    logger.remove()
+    logger.configure(patcher=patch_record)
+    prefix = prefix.replace("{", "{{").replace("}", "}}")
+
+    logger.add(QueuedWriter(DailyFile(log_file)), format=FILE_FORMAT, colorize=False, level=level)
+    if quiet:
+        logger.add(QueuedWriter(sys.stdout), format=QUIET_FORMAT.replace("{prefix}", prefix), colorize=False, level=level)
+    else:
+        logger.add(QueuedWriter(sys.stdout), format=CONSOLE_FORMAT.replace("{prefix}", prefix), colorize=True, level=level)
+    if json_file:
+        logger.add(JsonLinesWriter(DailyFile(json_file)), format="{message}", level=level)
@@ -1,82 +1,121 @@
+import argparse
 import asyncio
 import random
-import json
+import signal
+import time
 from datetime import datetime
-import aiohttp
+from yarl import URL
 from colorama import Fore, Style, init
 from loguru import logger
 import hashlib
-from config import FEATURES, MINING_CONFIG, UPGRADE_SEQUENCE
+from config import FEATURES, MINING_CONFIG, UPGRADE_SEQUENCE, UPGRADE_CONFIG, SCHEDULER_CONFIG, HTTP_CONFIG, STORAGE_CONFIG, TOKEN_CONFIG, MONITOR_CONFIG, METRICS_CONFIG, RETRY_CONFIG, SPIN_CONFIG, STATE_CONFIG, TASK_CONFIG, LOGGING_CONFIG, STAKE_CONFIG
+from scheduler import DeadlineScheduler, RateBudget, Visit, WakePlanner, backoff_delay
+from http_session import session_manager
+from storage import TokenStore, SignatureStore, UpgradeCostStore, ActionStore, ScheduleStore, next_daily_reset
+from account_state import AccountState
+from account_source import AccountSource
+from accounts import AccountRegistry
+from metrics import Metrics, current_account
+from spins import SpinSummary, plan_spin_batches
+from mining import UpgradeTable
+from tasks import TaskCatalog
+from staking import StakePolicy
+from supervisor import ShardSupervisor
+from logs import setup_logging
+import json_backend
 
 init(autoreset=True)
 
-logger.remove()
-logger.add(
-    "beeharvest.log",
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    rotation="1 day",
-    retention="7 days",
-    level="INFO"
-)
-logger.add(
-    lambda msg: print(msg, end=""),
-    colorize=True,
-    format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | <white>{message}</white>",
-    level="INFO"
-)
+setup_logging(LOGGING_CONFIG["file"], quiet=LOGGING_CONFIG["quiet"], json_file=LOGGING_CONFIG["json_file"])
+
+INVALID_JSON = object()
+# the steps of a visit in order, a visit interrupted by a shutdown resumes after the last one it finished
+VISIT_STEPS = ("streak", "donate", "spins", "combo", "mining", "squad", "tasks")
+# structure pieces collected before they are hashed
+STRUCTURE_CHUNK = 256
+
+
+def decode_json(content):
+    try:
+        return json_backend.loads(content)
+    except ValueError:
+        return INVALID_JSON
+
 
 class EndpointMonitor:
-    def __init__(self):
-        self.endpoint_signatures = {}
+    def __init__(self, store=None, max_depth=32):
+        self.store = store
+        self.max_depth = max_depth
+        self.endpoint_signatures = store.load() if store else {}
         
-    async def check_endpoint(self, session, url, method, headers=None, payload=None):
-        try:
-            if method.upper() == "GET":
-                async with session.get(url, headers=headers) as response:
-                    content = await response.text()
-            else:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    content = await response.text()
+    def check_response(self, method, url, status_code, content, data=INVALID_JSON):
+        # server errors say nothing about the API contract
+        if status_code >= 500:
+            return True
 
-            current_signature = self._generate_signature(response.status, content)
-            
-            if url not in self.endpoint_signatures:
-                self.endpoint_signatures[url] = current_signature
-                return True
-                
-            if self.endpoint_signatures[url] != current_signature:
-                logger.error(f"{Fore.RED}⚠️ API Endpoint changed: {url}{Style.RESET_ALL}")
-                return False
-                
+        key = f"{method.upper()} {url} {status_code}"
+        current_signature = self._generate_signature(status_code, content, data)
+        
+        if key not in self.endpoint_signatures:
+            self.endpoint_signatures[key] = current_signature
+            if self.store:
+                self.store.save(key, current_signature)
             return True
             
-        except Exception as e:
-            logger.error(f"Error checking endpoint {url}: {str(e)}")
+        if self.endpoint_signatures[key] != current_signature:
+            logger.error(f"{Fore.RED}⚠️ API Endpoint changed: {method.upper()} {url} ({status_code}){Style.RESET_ALL}")
             return False
             
-    def _generate_signature(self, status_code, content):
-        try:
-            data = json.loads(content)
-            structure = self._get_json_structure(data)
-            signature = f"{status_code}:{structure}"
-        except json.JSONDecodeError:
-            signature = f"{status_code}:{len(content)}"
+        return True
             
-        return hashlib.md5(signature.encode()).hexdigest()
-        
-    def _get_json_structure(self, obj):
-        if isinstance(obj, dict):
-            return '{' + ','.join(sorted(f'{k}:{self._get_json_structure(v)}' for k, v in obj.items())) + '}'
-        elif isinstance(obj, list) and obj:
-            return '[' + self._get_json_structure(obj[0]) + ']'
+    def _generate_signature(self, status_code, content, data=INVALID_JSON):
+        # callers that already decoded the body pass it in, so it is never parsed twice
+        if data is INVALID_JSON:
+            data = decode_json(content)
+        if data is INVALID_JSON:
+            if isinstance(content, bytes):
+                content = content.decode("utf-8", "replace")
+            return hashlib.md5(f"{status_code}:{len(content)}".encode()).hexdigest()
+
+        return self._structure_signature(status_code, data)
+
+    def _structure_signature(self, status_code, data):
+        # pieces are fed to md5 in bounded chunks: one update per node cost more than the hashing,
+        # one join of the whole walk held more memory than the old string
+        digest = hashlib.md5(f"{status_code}:".encode())
+        parts = []
+        self._update_structure(digest, parts, data, 0)
+        digest.update("".join(parts).encode())
+        return digest.hexdigest()
+
+    def _update_structure(self, digest, parts, obj, depth):
+        # all keys of a dict go in one piece, then only the values that nest are walked, under their key
+        if depth >= self.max_depth:
+            parts.append("value")
+        elif type(obj) is dict:
+            if len(parts) >= STRUCTURE_CHUNK:
+                digest.update("".join(parts).encode())
+                parts.clear()
+            keys = sorted(obj)
+            parts.append("{" + "\x1f".join(keys) + "}")
+            for key in keys:
+                value = obj[key]
+                if type(value) is dict or (type(value) is list and value):
+                    parts.append(key)
+                    self._update_structure(digest, parts, value, depth + 1)
+        elif type(obj) is list and obj:
+            parts.append("[")
+            self._update_structure(digest, parts, obj[0], depth + 1)
+            parts.append("]")
         else:
-            return 'value'
+            parts.append("value")
 
 class BeeHarvestBot:
-    def __init__(self):
-        self.base_url = "https://api.beeharvest.life"
-        self.session = None
-        self.endpoint_monitor = EndpointMonitor()
+    def __init__(self, base_url="https://api.beeharvest.life", accounts_file="data.txt", database=STORAGE_CONFIG["database"],
+                 shard=None, reports=None):
+        self.base_url = base_url
+        self.api_host = URL(base_url).host
+        # set once on every session, aiohttp copies them per session and merges each request's own headers into a new copy
         self.default_headers = {
             "Accept": "application/json, text/plain, */*",
             "Accept-Encoding": "gzip, deflate, br",
@@ -91,8 +130,33 @@ class BeeHarvestBot:
             "Sec-Fetch-Site": "same-site",
             "User-Agent": "Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36"
         }
-
-    def print_banner(self):
+        self.rate_budget = RateBudget(SCHEDULER_CONFIG["requests_per_second"], SCHEDULER_CONFIG["burst"], SCHEDULER_CONFIG["min_requests_per_second"])
+        self.schedule_store = ScheduleStore(database)
+        self.deadlines = DeadlineScheduler(self.process_account, SCHEDULER_CONFIG["workers"], SCHEDULER_CONFIG["max_interval"],
+                                           self.schedule_store, lambda account: account.key)
+        self.wake_planner = WakePlanner(SCHEDULER_CONFIG["min_interval"], SCHEDULER_CONFIG["max_interval"])
+        self.session_manager = session_manager(self.base_url, HTTP_CONFIG, self.default_headers)
+        self.token_store = TokenStore(database, TOKEN_CONFIG["default_ttl"], TOKEN_CONFIG["expiry_margin"])
+        self.endpoint_monitor = EndpointMonitor(SignatureStore(database), MONITOR_CONFIG["max_depth"])
+        self.action_store = ActionStore(database)
+        self.requests_saved = 0
+        self.actions_skipped = 0
+        self.task_catalog = TaskCatalog(TASK_CONFIG["catalog_ttl"])
+        self.task_checks = {"issued": 0, "skipped": 0}
+        self.stake_policy = StakePolicy(self.action_store, STAKE_CONFIG["min_amount"], STAKE_CONFIG["min_interval"])
+        self.metrics = Metrics()
+        self.account_source = AccountSource(accounts_file, shard)
+        self.account_registry = AccountRegistry(self.account_source)
+        self.shard = shard
+        self.reports = reports
+        self.spin_batch_sizes = list(SPIN_CONFIG["batch_sizes"])
+        self.upgrade_table = UpgradeTable(UpgradeCostStore(database), UPGRADE_CONFIG["probe_margin"])
+        # last finished step of every visit in flight, and of the visits a shutdown interrupted last time
+        self.visit_steps = {}
+        self.resume_steps = self.schedule_store.steps()
+
+    @staticmethod
+    def print_banner():
         banner = f"""{Fore.CYAN}
         ┏━━━━┳┓       ┏━━━┓    ┏┓        ┏━━━┓  ┏┓     ┏━┓    Auto BeeHarvest Bot
         ┃┏┓┏┓┃┃       ┃┏━┓┃    ┃┃        ┃┏━┓┃  ┃┃     ┃┏┛    Modified by @yogschannel
@@ -105,52 +169,83 @@ class BeeHarvestBot:
         print(banner)
         logger.info("Starting BeeHarvest Bot...")
 
-    async def safe_request(self, method, endpoint, headers=None, payload=None):
-        url = f"{self.base_url}{endpoint}"
+    async def safe_request(self, session, method, endpoint, headers=None, payload=None):
+        # a 429 means the request was not processed, so only then is a POST safe to repeat
+        idempotent = method.upper() == "GET"
+        attempts = RETRY_CONFIG["attempts"]
 
-        if not await self.endpoint_monitor.check_endpoint(self.session, url, method, headers, payload):
-            logger.error(f"{Fore.RED}Stopping bot due to API endpoint change{Style.RESET_ALL}")
+        for attempt in range(attempts + 1):
+            if attempt:
+                self.metrics.record_retry(method, endpoint)
+
+            await self.rate_budget.acquire(self.api_host)
+            started = time.perf_counter()
+            try:
+                response = await self.session_manager.request(session, method, endpoint, headers=headers, payload=payload)
+                status = response.status
+                retry_after = response.headers.get("Retry-After")
+                body = response.body
+                charset = response.charset
+            except self.session_manager.errors as e:
+                self.metrics.observe(method, endpoint, 0, time.perf_counter() - started, 0)
+                self.rate_budget.record(self.api_host, 0)
+                if not idempotent or attempt == attempts:
+                    raise
+                logger.warning(f"{Fore.YELLOW}{method} {endpoint} failed ({e.__class__.__name__}) - retrying{Style.RESET_ALL}")
+                await asyncio.sleep(backoff_delay(attempt, RETRY_CONFIG["base_delay"], RETRY_CONFIG["max_delay"]))
+                continue
+
+            self.metrics.observe(method, endpoint, status, time.perf_counter() - started, len(body))
+            self.rate_budget.record(self.api_host, status, retry_after)
+            if attempt < attempts and (status == 429 or (idempotent and status >= 500)):
+                logger.warning(f"{Fore.YELLOW}{method} {endpoint} returned {status} - retrying{Style.RESET_ALL}")
+                await asyncio.sleep(backoff_delay(attempt, RETRY_CONFIG["base_delay"], RETRY_CONFIG["max_delay"]))
+                continue
+            break
+
+        # the body is decoded once here and shared with the monitor
+        started = time.perf_counter()
+        content = body if charset in (None, "utf-8", "utf8") else body.decode(charset, "replace")
+        data = decode_json(content)
+        self.metrics.observe_decode(time.perf_counter() - started)
+
+        if not self.endpoint_monitor.check_response(method, f"{self.base_url}{endpoint}", status, content, data):
+            logger.error(f"{Fore.RED}Stopping bot due to API endpoint change - once the new structure is checked, "
+                         f"restart with --relearn-signatures to accept it{Style.RESET_ALL}")
             raise SystemExit("API endpoint structure changed")
-            
-        try:
-            if method.upper() == "GET":
-                async with self.session.get(url, headers=headers) as response:
-                    return await response.json()
-            else:
-                async with self.session.post(url, headers=headers, json=payload) as response:
-                    return await response.json()
-        except Exception as e:
-            logger.error(f"Request error: {str(e)}")
-            return None
 
-    async def get_token(self, user_data):
+        return status, data if isinstance(data, dict) else {}
+
+    async def get_token(self, session, account, refresh=False):
+        if refresh:
+            self.token_store.invalidate(account.key)
+        else:
+            token = self.token_store.get(account.key)
+            if token:
+                return token
+
         try:
-            headers = {**self.default_headers, "Content-Type": "application/json"}
-            response = await self.safe_request("POST", "/auth/validate", headers=headers, payload={"hash": user_data})
-            
-            if response:
-                token = response.get("data", {}).get("token")
-                if token:
-                    print(f"{Fore.GREEN}[{datetime.now().strftime('%H:%M:%S')}] Token received successfully{Style.RESET_ALL}")
-                    return token
-                else:
-                    token = response.get("data", {}).get("user", {}).get("token")
-                    if token:
-                        print(f"{Fore.GREEN}[{datetime.now().strftime('%H:%M:%S')}] Token received successfully from alternate path{Style.RESET_ALL}")
-                        return token
-            return None
+            headers = {"Content-Type": "application/json"}
+            status, result = await self.safe_request(session, "POST", "/auth/validate", headers=headers, payload={"hash": account.init_data})
+            if status != 200:
+                return None
+
+            data = result.get("data", {})
+            token = data.get("token") or data.get("user", {}).get("token")
+            if token:
+                self.token_store.set(account.key, token)
+            return token
         except Exception as e:
-            print(f"{Fore.RED}[{datetime.now().strftime('%H:%M:%S')}] Error during token request: {str(e)}{Style.RESET_ALL}")
+            logger.error(f"{Fore.RED}Error during token request: {str(e)}{Style.RESET_ALL}")
             return None
-            
+
     async def get_combo_items(self, session, auth_headers):
         try:
-            async with session.get("/combo_game/current", headers=auth_headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    items = data.get("data", {}).get("items", [])
-                    return [item["id"] for item in items]
-                return []
+            status, data = await self.safe_request(session, "GET", "/combo_game/current", headers=auth_headers)
+            if status == 200:
+                items = data.get("data", {}).get("items", [])
+                return [item["id"] for item in items]
+            return []
         except Exception as e:
             logger.error(f"Error getting combo items: {str(e)}")
             return []
@@ -170,36 +265,31 @@ class BeeHarvestBot:
                 payload = {"itemIds": selected_items}
                 headers = {**auth_headers, "Content-Type": "application/json"}
 
-                async with session.post("/combo_game/check_combo", headers=headers, json=payload) as response:
-                    result = await response.json()
-                    
-                    if response.status == 200:
-                        msg = result.get("message", "Unknown response")
-                        reward = result.get("data", {})
-                        if reward:
-                            logger.info(f"{Fore.GREEN}Combo Game: {msg} - Reward: {reward}{Style.RESET_ALL}")
-                        else:
-                            logger.info(f"{Fore.GREEN}Combo Game: {msg}{Style.RESET_ALL}")
+                status, result = await self.safe_request(session, "POST", "/combo_game/check_combo", headers=headers, payload=payload)
+
+                if status == 200:
+                    msg = result.get("message", "Unknown response")
+                    reward = result.get("data", {})
+                    if reward:
+                        logger.info(f"{Fore.GREEN}Combo Game: {msg} - Reward: {reward}{Style.RESET_ALL}")
+                    else:
+                        logger.info(f"{Fore.GREEN}Combo Game: {msg}{Style.RESET_ALL}")
+                else:
+                    msg = result.get("message", "Unknown error")
+                    if "already played" in msg.lower():
+                        logger.info(f"{Fore.YELLOW}Combo Game: {msg}{Style.RESET_ALL}")
                     else:
-                        msg = result.get("message", "Unknown error")
-                        if "already played" in msg.lower():
-                            logger.info(f"{Fore.YELLOW}Combo Game: {msg}{Style.RESET_ALL}")
-                        else:
-                            logger.error(f"{Fore.RED}Combo Game Error: {msg}{Style.RESET_ALL}")
+                        logger.error(f"{Fore.RED}Combo Game Error: {msg}{Style.RESET_ALL}")
 
             except Exception as e:
                 logger.error(f"Error in combo game: {str(e)}")
 
-    async def process_task(self, task, auth_headers):
+    async def process_task(self, session, task, auth_headers, key):
         try:
             task_id = task.get("id")
             title = task.get("title", "Unknown Task")
             task_type = task.get("type", "unknown")
             criterions = task.get("criterions", [])
-            
-            if task.get("ended", False):
-                print(f"{Fore.YELLOW}[Task] ⚠ {title} - Task has ended{Style.RESET_ALL}")
-                return
 
             if task_type == "other" and criterions:
                 for criterion in criterions:
@@ -207,51 +297,71 @@ class BeeHarvestBot:
                         try:
                             description = criterion.get("description")
                             if description:
-                                transfer_data = json.loads(description)
-                                print(f"{Fore.CYAN}[Task] ℹ {title} - Transfer task detected{Style.RESET_ALL}")
-                                await self.verify_task(task_id, auth_headers)
-                        except json.JSONDecodeError:
-                            print(f"{Fore.RED}[Task] ✗ {title} - Invalid transfer data format{Style.RESET_ALL}")
+                                transfer_data = json_backend.loads(description)
+                                logger.info(f"{Fore.CYAN}[Task] {title} - Transfer task detected{Style.RESET_ALL}")
+                                await self.verify_task(session, task_id, auth_headers, key)
+                                return
+                        except ValueError:
+                            logger.error(f"{Fore.RED}[Task] {title} - Invalid transfer data format{Style.RESET_ALL}")
             else:
-                await self.verify_task(task_id, auth_headers)
-                
+                await self.verify_task(session, task_id, auth_headers, key)
+
         except Exception as e:
-            print(f"{Fore.RED}[Task] ✗ Error processing {title}: {str(e)}{Style.RESET_ALL}")
+            logger.error(f"{Fore.RED}[Task] Error processing {title}: {str(e)}{Style.RESET_ALL}")
 
-    async def verify_task(self, task_id, auth_headers):
+    async def verify_task(self, session, task_id, auth_headers, key):
         try:
-            async with self.session.post(f"/tasks/check_tg_task/{task_id}", headers=auth_headers) as task_response:
-                if task_response.status == 200:
-                    response_data = await task_response.json()
-                    msg = response_data.get("message", "Task completed")
-                    print(f"{Fore.GREEN}[Task] ✓ {msg}{Style.RESET_ALL}")
-                else:
-                    response_data = await task_response.json()
-                    msg = response_data.get("message", "Unknown error")
-                    print(f"{Fore.YELLOW}[Task] ⚠ {msg}{Style.RESET_ALL}")
+            self.task_checks["issued"] += 1
+            status, response_data = await self.safe_request(session, "POST", f"/tasks/check_tg_task/{task_id}", headers=auth_headers)
+            if status == 200:
+                msg = response_data.get("message", "Task completed")
+                logger.success(f"{Fore.GREEN}[Task] {task_id}: {msg}{Style.RESET_ALL}")
+            else:
+                msg = response_data.get("message", "Unknown error")
+                logger.info(f"{Fore.YELLOW}[Task] {task_id}: {msg}{Style.RESET_ALL}")
+            if self.action_done(status, response_data):
+                self.action_store.done(key, f"task/{task_id}")
         except Exception as e:
-            print(f"{Fore.RED}[Task] ✗ Verification error: {str(e)}{Style.RESET_ALL}")
-
-    async def process_tasks(self, session, auth_headers):
-        async with session.get("/tasks/user", headers=auth_headers) as response:
-            if response.status == 200:
-                tasks = (await response.json()).get('data', [])
-                if tasks:
-                    logger.info(f"Found {len(tasks)} tasks")
-                    for task in tasks:
-                        if not task.get("ended", False):
-                            task_id = task.get("id")
-                            async with session.post(f"/tasks/check_tg_task/{task_id}", headers=auth_headers) as task_response:
-                                if task_response.status == 200:
-                                    logger.success(f"Task {task_id} completed")
+            logger.error(f"{Fore.RED}[Task] Verification error: {str(e)}{Style.RESET_ALL}")
+
+    def action_done(self, status, result):
+        # "already claimed" style answers mean there is nothing left to do either
+        return status == 200 or status == 400 and "already" in result.get("message", "").lower()
+
+    async def process_tasks(self, session, auth_headers, key):
+        async def fetch():
+            status, data = await self.safe_request(session, "GET", "/tasks/user", headers=auth_headers)
+            return data.get("data") or [] if status == 200 else None
+
+        tasks = [task for task in await self.task_catalog.get(fetch) if not task.get("ended", False)]
+        pending = [task for task in tasks if self.action_store.due(key, f"task/{task.get('id')}")]
+        self.task_checks["skipped"] += len(tasks) - len(pending)
+        if not pending:
+            return False
+
+        logger.info(f"Found {len(pending)} open tasks of {len(tasks)}")
+        semaphore = asyncio.Semaphore(TASK_CONFIG["concurrency"])
+        aborted = []
+
+        async def check(task):
+            async with semaphore:
+                try:
+                    await self.process_task(session, task, auth_headers, key)
+                except SystemExit as e:
+                    # raised inside a gathered task it would escape the event loop, past the scheduler
+                    aborted.append(e)
+
+        await asyncio.gather(*(check(task) for task in pending))
+        if aborted:
+            raise aborted[0]
+        return True
 
     async def get_spin_info(self, session, auth_headers):
         try:
-            async with session.get("/spinner/spin", headers=auth_headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("data", {})
-                return None
+            status, data = await self.safe_request(session, "GET", "/spinner/spin", headers=auth_headers)
+            if status == 200:
+                return data.get("data", {})
+            return None
         except Exception as e:
             logger.error(f"{Fore.RED}Error getting spin info: {str(e)}{Style.RESET_ALL}")
             return None
@@ -260,287 +370,455 @@ class BeeHarvestBot:
         try:
             payload = {"spin_count": spin_count}
             headers = {**auth_headers, "Content-Type": "application/json"}
-            async with session.post("/spinner/spin", headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    rewards = data.get("data", [])
-                    if rewards:
-                        for reward in rewards:
-                            reward_type = reward.get("type", "unknown")
-                            reward_value = reward.get("value", 0)
-                            reward_count = reward.get("count", 0)
-                            logger.info(f"{Fore.GREEN}Spin Reward: {reward_count}x {reward_type} (value: {reward_value}){Style.RESET_ALL}")
-                    return True
-                return False
+            status, data = await self.safe_request(session, "POST", "/spinner/spin", headers=headers, payload=payload)
+            if status == 200:
+                return status, data.get("data") or []
+            return status, None
         except Exception as e:
             logger.error(f"{Fore.RED}Error performing spin: {str(e)}{Style.RESET_ALL}")
-            return False
+            return 0, None
 
     async def process_spins(self, session, auth_headers):
         if not FEATURES["enable_spin"]:
             logger.info(f"{Fore.YELLOW}Spin feature is disabled in config{Style.RESET_ALL}")
-            return
+            return None, 0
 
         spin_info = await self.get_spin_info(session, auth_headers)
         if not spin_info:
-            return
+            return None, 0
 
         spin_count = spin_info.get("spin_count", 0)
+        available = spin_count
         logger.info(f"{Fore.CYAN}Available spins: {spin_count}{Style.RESET_ALL}")
 
-        while spin_count >= 5:
-            logger.info(f"{Fore.CYAN}Performing 5x spin{Style.RESET_ALL}")
-            if await self.perform_spin(session, auth_headers, 5):
-                spin_count -= 5
-            else:
+        summary = SpinSummary()
+        while spin_count > 0:
+            plan = plan_spin_batches(spin_count, self.spin_batch_sizes)
+            if not plan:
                 break
-            await asyncio.sleep(1)
 
-        while spin_count >= 3:
-            logger.info(f"{Fore.CYAN}Performing 3x spin{Style.RESET_ALL}")
-            if await self.perform_spin(session, auth_headers, 3):
-                spin_count -= 3
-            else:
+            # one account's batches go out one after another, a server that refuses overlapping spins
+            # would otherwise look like it refuses the batch sizes
+            rejected = []
+            for size in plan:
+                status, rewards = await self.perform_spin(session, auth_headers, size)
+                if rewards is not None:
+                    summary.add(size, rewards)
+                elif status == 400:
+                    rejected.append(size)
+                    break
+            if not rejected:
                 break
-            await asyncio.sleep(1)
 
-        while spin_count >= 1:
-            logger.info(f"{Fore.CYAN}Performing 1x spin{Style.RESET_ALL}")
-            if await self.perform_spin(session, auth_headers, 1):
-                spin_count -= 1
-            else:
+            spin_info = await self.get_spin_info(session, auth_headers)
+            spin_count = spin_info.get("spin_count", 0) if spin_info else 0
+            # a batch refused while enough spins are left means the server does not take that size
+            dropped = [size for size in set(rejected) if 1 < size <= spin_count and size in self.spin_batch_sizes]
+            if not dropped:
                 break
-            await asyncio.sleep(1)
+            for size in dropped:
+                self.spin_batch_sizes.remove(size)
+                logger.warning(f"{Fore.YELLOW}Server rejected {size}x spins - no longer using that batch size{Style.RESET_ALL}")
+
+        if summary.batches:
+            logger.info(f"{Fore.GREEN}Spin rewards: {summary}{Style.RESET_ALL}")
+        return available, max(0, available - summary.spins)
 
-    async def check_squad_status(self, session, auth_headers):
+    async def check_squad_status(self, state):
         try:
-            async with session.get("/user/profile", headers=auth_headers) as response:
-                if response.status == 200:
-                    user_info = await response.json()
-                    squad_id = user_info.get("data", {}).get("squad_id")
-                    return squad_id is not None and squad_id > 0
-                return False
+            profile = await state.profile()
+            if profile:
+                squad_id = profile.get("squad_id")
+                return squad_id is not None and squad_id > 0
+            return False
         except Exception as e:
             logger.error(f"Error checking squad status: {str(e)}")
             return False
 
-    async def check_honey_level(self, session, auth_headers):
+    async def check_honey_level(self, state):
         try:
-            async with session.get("/user/mining", headers=auth_headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    honey_data = data.get("data", {}).get("honey", {})
-                    honey_level = honey_data.get("level", 0)
-                    return honey_level
-                return 0
+            mining = await state.mining()
+            if mining:
+                honey_data = mining.get("honey", {})
+                honey_level = honey_data.get("level", 0)
+                return honey_level
+            return 0
         except Exception as e:
             logger.error(f"{Fore.RED}Error checking honey level: {str(e)}{Style.RESET_ALL}")
             return 0
 
     async def upgrade_mining_component(self, session, auth_headers, component_type):
         try:
-            component_config = MINING_CONFIG.get(component_type)
-            if not component_config or not component_config["enabled"]:
-                logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): Disabled in config{Style.RESET_ALL}")
-                return False
+            status, result = await self.safe_request(session, "POST", f"/user/boost/{component_type}/next_level", headers=auth_headers)
+            if status != 200:
+                msg = result.get("message", "Unknown error")
+                if "insufficient" in msg.lower():
+                    logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): Insufficient funds{Style.RESET_ALL}")
+                    return False
+                logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): {msg}{Style.RESET_ALL}")
+                return None
+
+            data = result.get("data", {})
+            current = result.get("current", {})
+            if not data or not current:
+                msg = result.get("message", "Unknown response")
+                logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): {msg}{Style.RESET_ALL}")
+                return None
+
+            self.upgrade_table.learn_upgrade(component_type, result)
+            logger.success(f"{Fore.GREEN}Mining Upgrade ({component_type}): Upgraded from level {data.get('level', 0)} to {current.get('level', 0)}{Style.RESET_ALL}")
+            return current
 
-            max_level = component_config["max_level"]
-                    
-            while True:
-                async with session.post(f"/user/boost/{component_type}/next_level", headers=auth_headers) as response:
-                    result = await response.json()
-                    
-                    if response.status != 200:
-                        msg = result.get("message", "Unknown error")
-                        if "insufficient" in msg.lower():
-                            logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): Insufficient funds{Style.RESET_ALL}")
-                            return False
-                        else:
-                            logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): {msg}{Style.RESET_ALL}")
-                            return False
-                    
-                    data = result.get("data", {})
-                    current = result.get("current", {})
-                    
-                    if data and current:
-                        old_level = data.get("level", 0)
-                        new_level = current.get("level", 0)
-                        
-                        if new_level >= max_level:
-                            logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): Stopping at level {old_level} (max desired: {max_level}){Style.RESET_ALL}")
-                            return False
-                            
-                        logger.success(f"{Fore.GREEN}Mining Upgrade ({component_type}): Upgraded from level {old_level} to {new_level}{Style.RESET_ALL}")
-                    else:
-                        msg = result.get("message", "Unknown response")
-                        logger.info(f"{Fore.YELLOW}Mining Upgrade ({component_type}): {msg}{Style.RESET_ALL}")
-                        return False
-                
-                await asyncio.sleep(1)
-                
         except Exception as e:
             logger.error(f"{Fore.RED}Error upgrading {component_type}: {str(e)}{Style.RESET_ALL}")
-            return False
+            return None
 
     async def star_my_repo(self, session, auth_headers):
         try:
             headers = {**auth_headers, "Content-Type": "application/json"}
             payload = {"amount": 10}
             
-            async with session.post("/squads/donate_pool/2637", headers=headers, json=payload) as response:
-                result = await response.json()
-                if response.status == 200:
-                    logger.success(f"{Fore.GREEN}Dont Forget to Star my github Repo{Style.RESET_ALL}")
-                else:
-                    msg = result.get("message", "Unknown error")
-                    logger.info(f"{Fore.YELLOW}The Order: {msg}{Style.RESET_ALL}")
+            status, result = await self.safe_request(session, "POST", "/squads/donate_pool/2637", headers=headers, payload=payload)
+            if status == 200:
+                logger.success(f"{Fore.GREEN}Dont Forget to Star my github Repo{Style.RESET_ALL}")
+            else:
+                msg = result.get("message", "Unknown error")
+                logger.info(f"{Fore.YELLOW}The Order: {msg}{Style.RESET_ALL}")
         except Exception as e:
             logger.error(f"{Fore.RED}Error donating to squad: {str(e)}{Style.RESET_ALL}")
 
-    async def process_mining_upgrades(self, session, auth_headers):
-        for component in UPGRADE_SEQUENCE:
-            if MINING_CONFIG[component]["enabled"]:
-                logger.info(f"{Fore.CYAN}Attempting to upgrade {component} (max level: {MINING_CONFIG[component]['max_level']}){Style.RESET_ALL}")
-                await self.upgrade_mining_component(session, auth_headers, component)
-                await asyncio.sleep(1)
+    async def learn_upgrade_price(self, state, component, level, balance, price):
+        # without a price in the response the balance it took is the price
+        if price is not None:
+            return balance - float(price)
+        state.invalidate("/user/profile")
+        profile = await state.profile()
+        if not profile or profile.get("balance") is None:
+            return balance
+        paid = balance - float(profile["balance"])
+        if paid > 0:
+            self.upgrade_table.learn(component, level, price=paid)
+        return float(profile["balance"])
+
+    async def process_mining_upgrades(self, session, auth_headers, state):
+        max_levels = {
+            component: MINING_CONFIG[component]["max_level"]
+            for component in UPGRADE_SEQUENCE if MINING_CONFIG[component]["enabled"]
+        }
+        if not max_levels:
+            return None, False
+
+        mining = await state.mining() or {}
+        profile = await state.profile() or {}
+        self.upgrade_table.learn_mining(mining)
+        levels = {
+            component: mining[component]["level"]
+            for component in max_levels if isinstance(mining.get(component), dict) and mining[component].get("level") is not None
+        }
+        balance = float(profile.get("balance") or 0)
+        start = dict(levels)
 
-    async def process_account(self, user_data):
-        async with aiohttp.ClientSession(base_url=self.base_url) as session:
+        # known prices are bought by plan, then one unknown price at a time is probed, and every
+        # success can reveal the next price, so plan again until nothing more can be bought
+        while True:
+            plan = self.upgrade_table.plan(levels, balance, max_levels)
+            if plan:
+                logger.info(f"{Fore.CYAN}Mining plan: {len(plan)} upgrades for {sum(price for _, _, price in plan):.2f} of {balance:.2f} balance{Style.RESET_ALL}")
+            else:
+                plan = [(component, None, None) for component in self.upgrade_table.unknown(levels, max_levels, balance)[:1]]
+                if not plan:
+                    break
+            for component, level, price in plan:
+                current = await self.upgrade_mining_component(session, auth_headers, component)
+                if current is False:
+                    self.upgrade_table.learn_floor(component, levels[component] + 1, balance)
+                if not current:
+                    break
+                levels[component] = current.get("level", levels[component] + 1)
+                balance = await self.learn_upgrade_price(state, component, levels[component], balance, current.get("price") or price)
+            else:
+                continue
+            # a refused probe moves on to the next component, a failed plan means the balance or
+            # the price moved under us, so plan again next cycle
+            if current is not False or price is not None:
+                break
+        return self.upgrade_table.cheapest(levels, max_levels), levels != start
+
+    async def process_account(self, account):
+        key = account.key
+        visit = Visit(account)
+        # each scheduler worker runs in its own task, so this only tags this account's requests
+        current_account.set(key[:12])
+        async with self.session_manager.session() as session:
             try:
-                headers = {**self.default_headers, "Content-Type": "application/json"}
-                async with session.post("/auth/validate", headers=headers, json={"hash": user_data}) as response:
-                    if response.status != 200:
-                        logger.error(f"{Fore.RED}Failed to get token - skipping account{Style.RESET_ALL}")
-                        return
-                    token = (await response.json()).get("data", {}).get("token")
-                    if not token:
-                        logger.error(f"{Fore.RED}No token received - skipping account{Style.RESET_ALL}")
-                        return
-
-                auth_headers = {**self.default_headers, "Authorization": f"Bearer {token}"}
-
-                async with session.get("/user/profile", headers=auth_headers) as response:
-                    if response.status == 200:
-                        user_info = await response.json()
-                        username = user_info.get("data", {}).get("tg_username")
-                        balance = user_info.get("data", {}).get("balance")
-                        logger.info(f"{Fore.CYAN}Account: {username} | Balance: {balance}{Style.RESET_ALL}")
-
-                async with session.post("/user/streak/claim", headers=auth_headers) as response:
-                    msg = (await response.json()).get("message", "Unknown response")
-                    logger.info(f"{Fore.GREEN}Daily Login: {msg}{Style.RESET_ALL}")
+                token = await self.get_token(session, account)
+                if not token:
+                    logger.error(f"{Fore.RED}Failed to get token - skipping account{Style.RESET_ALL}")
+                    return
 
-                await self.star_my_repo(session, auth_headers)
-                await self.process_spins(session, auth_headers)
-                await self.play_combo_game(session, auth_headers)
-                await self.process_mining_upgrades(session, auth_headers)
+                auth_headers = {"Authorization": f"Bearer {token}"}
+                state = AccountState(self.safe_request, session, auth_headers)
+                profile = await state.profile()
 
-                async with session.post("/user/join_squad/2637", headers=auth_headers) as response:
-                    msg = (await response.json()).get("message", "Unknown response")
-                    logger.info(f"{Fore.GREEN}Join Squad: {msg}{Style.RESET_ALL}")
+                if state.status.get("/user/profile") == 401:
+                    logger.info(f"{Fore.YELLOW}Cached token rejected - re-authenticating{Style.RESET_ALL}")
+                    token = await self.get_token(session, account, refresh=True)
+                    if not token:
+                        logger.error(f"{Fore.RED}Failed to get token - skipping account{Style.RESET_ALL}")
+                        return
+                    auth_headers = {"Authorization": f"Bearer {token}"}
+                    state.set_auth_headers(auth_headers)
+                    profile = await state.profile()
+
+                if profile:
+                    username = profile.get("tg_username")
+                    balance = profile.get("balance")
+                    visit.balance = float(balance or 0)
+                    logger.info(f"{Fore.CYAN}Account: {username} | Balance: {balance}{Style.RESET_ALL}")
+
+                # a visit cut short by a shutdown picks up after its last finished step
+                resumed = self.resume_steps.pop(key, None)
+                resume = VISIT_STEPS.index(resumed) if resumed in VISIT_STEPS else -1
+                if resumed:
+                    logger.info(f"{Fore.CYAN}Resuming after step: {resumed}{Style.RESET_ALL}")
+                if resume < VISIT_STEPS.index("streak"):
+                    if self.action_store.due(key, "streak"):
+                        status, result = await self.safe_request(session, "POST", "/user/streak/claim", headers=auth_headers)
+                        msg = result.get("message", "Unknown response")
+                        logger.info(f"{Fore.GREEN}Daily Login: {msg}{Style.RESET_ALL}")
+                        if self.action_done(status, result):
+                            self.action_store.done(key, "streak", next_daily_reset(reset_hour=STATE_CONFIG["daily_reset_hour"]))
+                        state.invalidate("/user/profile")
+                    else:
+                        self.actions_skipped += 1
+                    self.visit_steps[key] = "streak"
+
+                if resume < VISIT_STEPS.index("donate"):
+                    # accounts can be woken every min_interval now, the donation keeps the old cycle's pace
+                    if self.action_store.due(key, "donate"):
+                        await self.star_my_repo(session, auth_headers)
+                        self.action_store.done(key, "donate", time.time() + STATE_CONFIG["donate_interval"])
+                        state.invalidate("/user/profile")
+                    else:
+                        self.actions_skipped += 1
+                    self.visit_steps[key] = "donate"
+                if resume < VISIT_STEPS.index("spins"):
+                    visit.spins, visit.end_spins = await self.process_spins(session, auth_headers)
+                    if visit.spins and visit.end_spins < visit.spins:
+                        state.invalidate("/user/profile")
+                    self.visit_steps[key] = "spins"
+                if resume < VISIT_STEPS.index("combo"):
+                    # play_combo_game returns before its request, there is nothing to invalidate
+                    await self.play_combo_game(session, auth_headers)
+                    self.visit_steps[key] = "combo"
+                if resume < VISIT_STEPS.index("mining"):
+                    visit.upgrade_price, upgraded = await self.process_mining_upgrades(session, auth_headers, state)
+                    if upgraded:
+                        state.invalidate("/user/profile", "/user/mining")
+                    self.visit_steps[key] = "mining"
+
+                if resume < VISIT_STEPS.index("squad"):
+                    # an account that left its squad has to join again
+                    if profile and not profile.get("squad_id"):
+                        self.action_store.reset(key, "join_squad/2637")
+                    if self.action_store.due(key, "join_squad/2637"):
+                        status, result = await self.safe_request(session, "POST", "/user/join_squad/2637", headers=auth_headers)
+                        msg = result.get("message", "Unknown response")
+                        logger.info(f"{Fore.GREEN}Join Squad: {msg}{Style.RESET_ALL}")
+                        if self.action_done(status, result):
+                            self.action_store.done(key, "join_squad/2637")
+                        state.invalidate("/user/profile")
+                    else:
+                        self.actions_skipped += 1
+                    self.visit_steps[key] = "squad"
 
-                await self.process_tasks(session, auth_headers)
+                if resume < VISIT_STEPS.index("tasks"):
+                    if await self.process_tasks(session, auth_headers, key):
+                        state.invalidate("/user/profile")
+                    self.visit_steps[key] = "tasks"
 
-                is_in_squad = await self.check_squad_status(session, auth_headers)
+                is_in_squad = await self.check_squad_status(state)
 
                 if FEATURES["enable_stake"]:
-                    async with session.get("/user/profile", headers=auth_headers) as response:
-                        if response.status == 200:
-                            user_info = await response.json()
-                            balance = float(user_info.get("data", {}).get("balance", 0))
-                            logger.info(f"{Fore.CYAN}Balance: {balance:.5f}{Style.RESET_ALL}")
-
-                            if balance > 0:
-                                if is_in_squad:
-                                    stake_payload = {"amount": balance}
-                                    headers = {**auth_headers, "Content-Type": "application/json"}
-                                    async with session.post("/token_pool/", headers=headers, json=stake_payload) as response:
-                                        status = "✓" if response.status == 200 else "✗"
-                                        logger.info(f"{Fore.GREEN}Staked {balance:.5f} tokens - Status: {status}{Style.RESET_ALL}")
-                                else:
-                                    logger.warning(f"{Fore.YELLOW}Skipping stake for {balance:.5f} tokens - Account not in squad{Style.RESET_ALL}")
+                    # the squad check above already loaded the profile, its balance is reused here
+                    profile = await state.profile()
+                    if profile:
+                        balance = float(profile.get("balance", 0))
+                        visit.end_balance = balance
+                        logger.info(f"{Fore.CYAN}Balance: {balance:.5f}{Style.RESET_ALL}")
+
+                        if balance > 0 and not is_in_squad:
+                            logger.warning(f"{Fore.YELLOW}Skipping stake for {balance:.5f} tokens - Account not in squad{Style.RESET_ALL}")
+                        elif self.stake_policy.due(key, balance):
+                            stake_payload = {"amount": balance}
+                            headers = {**auth_headers, "Content-Type": "application/json"}
+                            stake_status, _ = await self.safe_request(session, "POST", "/token_pool/", headers=headers, payload=stake_payload)
+                            status = "✓" if stake_status == 200 else "✗"
+                            if stake_status == 200:
+                                visit.end_balance = 0.0
+                                self.stake_policy.done(key, balance)
+                            logger.info(f"{Fore.GREEN}Staked {balance:.5f} tokens - Status: {status}{Style.RESET_ALL}")
+                            state.invalidate("/user/profile")
+                        elif balance > 0:
+                            visit.deadlines.append(self.stake_policy.next_at(key, balance))
+                            logger.info(f"{Fore.CYAN}Holding {balance:.5f} tokens for a later stake{Style.RESET_ALL}")
+
+                self.requests_saved += state.saved
+                visit.deadlines.append(self.action_store.next_at(key, "streak"))
+                self.visit_steps.pop(key, None)
+                return self.wake_planner.next_wake(visit)
 
             except Exception as e:
+                # a failed visit starts over, only a shutdown leaves its steps behind to resume from
+                self.visit_steps.pop(key, None)
                 logger.error(f"{Fore.RED}Account Error: {str(e)}{Style.RESET_ALL}")
 
-    async def process_all_accounts(self):
-        try:
-            try:
-                with open("data.txt", "r") as file:
-                    accounts = file.readlines()
-                    if not accounts:
-                        print(f"{Fore.RED}[{datetime.now().strftime('%H:%M:%S')}] data.txt is empty{Style.RESET_ALL}")
-                        return
-                    print(f"{Fore.GREEN}[{datetime.now().strftime('%H:%M:%S')}] Found {len(accounts)} accounts in data.txt{Style.RESET_ALL}")
-            except FileNotFoundError:
-                print(f"{Fore.RED}[{datetime.now().strftime('%H:%M:%S')}] data.txt not found{Style.RESET_ALL}")
-                return
-
-            for i, account_data in enumerate(accounts):
-                account_data = account_data.strip()
-                if account_data:
-                    print(f"\n{Fore.CYAN}[{datetime.now().strftime('%H:%M:%S')}] Processing account {i+1}/{len(accounts)}{Style.RESET_ALL}")
-                    await self.process_account(account_data)
-                    if i < len(accounts) - 1:
-                        print(f"\n{Fore.YELLOW}[{datetime.now().strftime('%H:%M:%S')}] Waiting 3 seconds before next account...{Style.RESET_ALL}\n")
-                        await asyncio.sleep(3)
-                else:
-                    print(f"{Fore.YELLOW}[{datetime.now().strftime('%H:%M:%S')}] Skipping empty line in data.txt{Style.RESET_ALL}")
+    def request_shutdown(self, signum=None):
+        if self.deadlines.stopping:
+            return
+        name = signal.Signals(signum).name if signum else "shutdown"
+        logger.warning(f"{Fore.YELLOW}{name} received - finishing accounts in flight before stopping{Style.RESET_ALL}")
+        self.deadlines.stop()
 
-        except Exception as e:
-            print(f"{Fore.RED}[{datetime.now().strftime('%H:%M:%S')}] Error in process_all_accounts: {str(e)}{Style.RESET_ALL}")
+    def save_checkpoint(self):
+        # visits still in flight are resumed after their last finished step on the next start
+        self.schedule_store.save_steps(self.visit_steps)
+        if self.visit_steps:
+            logger.info(f"Saved checkpoints for {len(self.visit_steps)} interrupted accounts")
 
     async def run(self):
-        self.print_banner()
+        # in shard mode the supervisor prints the banner and owns the metrics file and port
+        if self.reports is None:
+            self.print_banner()
         cycle_count = 1
-        
-        while True:
+        failures = 0
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
             try:
-                logger.info(f"Starting Cycle #{cycle_count}")
+                loop.add_signal_handler(signum, self.request_shutdown, signum)
+            except NotImplementedError:
+                # Windows has no loop signal handlers, Ctrl+C still stops the bot without a checkpoint
+                pass
+        if METRICS_CONFIG["port"] and self.reports is None:
+            await self.metrics.serve(port=METRICS_CONFIG["port"])
+            logger.info(f"Metrics available at http://127.0.0.1:{METRICS_CONFIG['port']}/metrics")
+        
+        async with self.session_manager:
+            while True:
+                try:
+                    self.requests_saved = 0
+                    self.actions_skipped = 0
+                    self.task_checks = {"issued": 0, "skipped": 0}
+                    self.stake_policy.reset()
+                    self.metrics.start_cycle()
                 
-                async with aiohttp.ClientSession() as self.session:
                     try:
-                        with open("data.txt", "r") as file:
-                            accounts = [line.strip() for line in file if line.strip()]
-                        
-                        if not accounts:
-                            logger.error("data.txt is empty")
-                            return
+                        added = self.account_source.refresh()
+                        if not self.account_source.count:
+                            if self.shard is None:
+                                logger.error("data.txt is empty")
+                                return
+                            # a small pool can leave a shard without accounts, it idles until data.txt grows
+                            logger.info("No accounts in this shard - waiting for data.txt to change")
 
-                        logger.info(f"Found {len(accounts)} accounts")
+                        if added:
+                            if cycle_count > 1:
+                                logger.info(f"data.txt changed - scanned {added} accounts")
+                            accounts = await self.deadlines.sync(self.account_registry)
+                            logger.info(f"Found {accounts} accounts")
 
-                        for i, account_data in enumerate(accounts, 1):
-                            logger.info(f"Processing account {i}/{len(accounts)}")
-                            try:
-                                await self.process_account(account_data)
-                            except SystemExit as e:
-                                logger.error(f"{Fore.RED}Bot stopped: {str(e)}{Style.RESET_ALL}")
-                                return
-                            if i < len(accounts):
-                                await asyncio.sleep(3)
+                        try:
+                            # accounts are woken as they become due, stats are reported once per interval
+                            stats = await self.deadlines.run(time.time() + SCHEDULER_CONFIG["report_interval"],
+                                                             SCHEDULER_CONFIG["shutdown_grace"])
+                        except SystemExit as e:
+                            self.save_checkpoint()
+                            logger.error(f"{Fore.RED}Bot stopped: {str(e)}{Style.RESET_ALL}")
+                            return
 
                     except FileNotFoundError:
                         logger.error("data.txt not found")
                         return
 
-                logger.info(f"Cycle #{cycle_count} completed. Waiting 10 minutes...")
-                
-                for remaining in range(600, 0, -1):
-                    minutes = remaining // 60
-                    seconds = remaining % 60
-                    print(f"Next cycle in: {minutes:02d}:{seconds:02d}", end='\r')
-                    await asyncio.sleep(1)
-                
-                cycle_count += 1
+                    if stats.processed or stats.failed:
+                        logger.info(f"Round #{cycle_count} completed: {stats}")
+                        logger.info(f"Connections: {self.session_manager.stats}")
+                        logger.info(f"Account snapshots saved {self.requests_saved} requests")
+                        logger.info(f"Skipped {self.actions_skipped} daily, one-time and paced actions that were not due")
+                        logger.info(f"Task checks: {self.task_checks['issued']} issued, {self.task_checks['skipped']} skipped as already completed")
+                        logger.info(f"Staking: {self.stake_policy}")
+                        for line in self.metrics.summary_table():
+                            logger.info(line)
+                        if METRICS_CONFIG["file"] and self.reports is None:
+                            self.metrics.write(METRICS_CONFIG["file"], METRICS_CONFIG["format"])
+                        next_due = self.deadlines.next_due()
+                        if next_due:
+                            logger.info(f"Next account due at {datetime.fromtimestamp(next_due).strftime('%H:%M:%S')}")
+                        cycle_count += 1
+                    if self.deadlines.stopping:
+                        self.save_checkpoint()
+                        logger.warning(f"{Fore.YELLOW}Bot stopped, restart to resume{Style.RESET_ALL}")
+                        return
+                    if self.reports is not None:
+                        self.reports.put({
+                            "shard": self.shard[0],
+                            "metrics": self.metrics.snapshot(),
+                            "cycle": self.metrics.cycle_snapshot(),
+                            "totals": {
+                                "processed": stats.processed,
+                                "failed": stats.failed,
+                                "requests_saved": self.requests_saved,
+                                "actions_skipped": self.actions_skipped,
+                                "tasks_issued": self.task_checks["issued"],
+                                "tasks_skipped": self.task_checks["skipped"],
+                                "stakes": self.stake_policy.stakes,
+                                "staked": self.stake_policy.staked,
+                                "stakes_avoided": self.stake_policy.avoided
+                            }
+                        })
+                    failures = 0
+
+                except Exception as e:
+                    delay = backoff_delay(failures, RETRY_CONFIG["base_delay"] * 10, RETRY_CONFIG["max_delay"] * 10)
+                    failures += 1
+                    logger.error(f"Error: {str(e)}")
+                    logger.warning(f"Waiting {delay:.0f} seconds before retry...")
+                    await asyncio.sleep(delay)
+
+def run_shard(index, count, reports):
+    # each shard is its own process with its own event loop, connection pool and log file
+    setup_logging(f"beeharvest.shard{index}.log", f"[{index + 1}/{count}] ", LOGGING_CONFIG["quiet"],
+                  LOGGING_CONFIG["json_file"] and f"beeharvest.shard{index}.jsonl")
+    bot = BeeHarvestBot(shard=(index, count), reports=reports)
+    try:
+        asyncio.run(bot.run())
+    except KeyboardInterrupt:
+        pass
 
-            except Exception as e:
-                logger.error(f"Error: {str(e)}")
-                logger.warning("Waiting 60 seconds before retry...")
-                await asyncio.sleep(60)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auto BeeHarvest Bot")
+    parser.add_argument("--workers", type=int, default=1, help="processes to shard data.txt across")
+    parser.add_argument("--quiet", action="store_true", help="plain console output without colors")
+    parser.add_argument("--relearn-signatures", action="store_true",
+                        help="forget the stored API response structures and accept the current ones")
+    args = parser.parse_args()
+    if args.quiet:
+        LOGGING_CONFIG["quiet"] = True
+        setup_logging(LOGGING_CONFIG["file"], quiet=True, json_file=LOGGING_CONFIG["json_file"])
+    if args.relearn_signatures:
+        signature_store = SignatureStore(STORAGE_CONFIG["database"])
+        logger.warning(f"{Fore.YELLOW}Forgot {signature_store.clear()} stored API structures - relearning them from the next responses{Style.RESET_ALL}")
+        signature_store.close()
+
     try:
-        bot = BeeHarvestBot()
-        asyncio.run(bot.run())
+        if args.workers > 1:
+            BeeHarvestBot.print_banner()
+            supervisor = ShardSupervisor(run_shard, args.workers, METRICS_CONFIG)
+            supervisor.start()
+            asyncio.run(supervisor.run())
+        else:
+            bot = BeeHarvestBot()
+            asyncio.run(bot.run())
     except KeyboardInterrupt:
         logger.warning("Bot stopped by user")
\ No newline at end of file
@@ -0,0 +1,258 @@
+import contextvars
+import json
+import os
+import re
+from collections import Counter
+
+from aiohttp import web
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+BOOST_SEGMENT = re.compile(r"^/user/boost/[^/]+/")
+
+current_account = contextvars.ContextVar("current_account", default=None)
+
+
+def endpoint_name(method, path):
+    path = BOOST_SEGMENT.sub("/user/boost/{type}/", ID_SEGMENT.sub("/{id}", path))
+    return f"{method.upper()} {path}"
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.statuses = Counter()
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, status, latency, size):
+        self.requests += 1
+        self.bytes += size
+        self.latency_sum += latency
+        self.statuses[status] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    @property
+    def errors(self):
+        return sum(count for status, count in self.statuses.items() if not 200 <= status < 300)
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the requested rank
+        rank = fraction * self.requests
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+        return 0.0
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "latency_sum": round(self.latency_sum, 6),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], self.buckets))
+        }
+
+    def merge(self, snapshot):
+        self.requests += snapshot["requests"]
+        self.retries += snapshot["retries"]
+        self.bytes += snapshot["bytes"]
+        self.latency_sum += snapshot["latency_sum"]
+        for status, count in snapshot["statuses"].items():
+            self.statuses[int(status)] += count
+        for i, count in enumerate(snapshot["buckets"].values()):
+            self.buckets[i] += count
+
+
+class AccountMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.errors = 0
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "latency_sum": round(self.latency_sum, 6),
+            "errors": self.errors
+        }
+
+    def merge(self, snapshot):
+        for name, value in snapshot.items():
+            setattr(self, name, getattr(self, name) + value)
+
+
+class Metrics:
+    def __init__(self):
+        self.endpoints = {}
+        self.accounts = {}
+        self.cycle = {}
+        self.decode_seconds = 0.0
+        self.cycle_decode_seconds = 0.0
+
+    def observe_decode(self, seconds):
+        self.decode_seconds += seconds
+        self.cycle_decode_seconds += seconds
+
+    def observe(self, method, path, status, latency, size):
+        name = endpoint_name(method, path)
+        for endpoints in (self.endpoints, self.cycle):
+            if name not in endpoints:
+                endpoints[name] = EndpointMetrics()
+            endpoints[name].observe(status, latency, size)
+
+        account = self._account()
+        if account:
+            account.requests += 1
+            account.bytes += size
+            account.latency_sum += latency
+            if not 200 <= status < 300:
+                account.errors += 1
+
+    def record_retry(self, method, path):
+        name = endpoint_name(method, path)
+        for endpoints in (self.endpoints, self.cycle):
+            if name not in endpoints:
+                endpoints[name] = EndpointMetrics()
+            endpoints[name].retries += 1
+
+        account = self._account()
+        if account:
+            account.retries += 1
+
+    def _account(self):
+        key = current_account.get()
+        if key is None:
+            return None
+        if key not in self.accounts:
+            self.accounts[key] = AccountMetrics()
+        return self.accounts[key]
+
+    def start_cycle(self):
+        self.cycle = {}
+        self.cycle_decode_seconds = 0.0
+
+    def cycle_snapshot(self):
+        return {name: endpoint.snapshot() for name, endpoint in self.cycle.items()}
+
+    def merge_cycle(self, snapshot):
+        # a shard's requests since its last report, summed into this round's table
+        for name, data in snapshot.items():
+            if name not in self.cycle:
+                self.cycle[name] = EndpointMetrics()
+            self.cycle[name].merge(data)
+
+    def merge(self, snapshot):
+        # adds up snapshots from shard processes, see supervisor.py
+        for name, data in snapshot["endpoints"].items():
+            if name not in self.endpoints:
+                self.endpoints[name] = EndpointMetrics()
+            self.endpoints[name].merge(data)
+        for key, data in snapshot["accounts"].items():
+            if key not in self.accounts:
+                self.accounts[key] = AccountMetrics()
+            self.accounts[key].merge(data)
+        self.decode_seconds += snapshot.get("decode_seconds", 0.0)
+
+    def summary_table(self, endpoints=None):
+        endpoints = self.cycle if endpoints is None else endpoints
+        lines = [f"{'endpoint':<40} {'reqs':>6} {'errs':>5} {'retry':>5} {'avg ms':>8} {'p50 ms':>7} {'p99 ms':>7} {'KB':>8}"]
+        for name, endpoint in sorted(endpoints.items(), key=lambda item: -item[1].latency_sum):
+            average = endpoint.latency_sum / endpoint.requests * 1000 if endpoint.requests else 0
+            lines.append(
+                f"{name:<40} {endpoint.requests:>6} {endpoint.errors:>5} {endpoint.retries:>5} {average:>8.1f} "
+                f"{endpoint.percentile(0.5) * 1000:>7.0f} {endpoint.percentile(0.99) * 1000:>7.0f} {endpoint.bytes / 1024:>8.1f}"
+            )
+        return lines
+
+    def snapshot(self):
+        return {
+            "endpoints": {name: endpoint.snapshot() for name, endpoint in self.endpoints.items()},
+            "accounts": {key: account.snapshot() for key, account in self.accounts.items()},
+            "decode_seconds": round(self.decode_seconds, 6)
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP beeharvest_requests_total Requests sent to the BeeHarvest API.",
+            "# TYPE beeharvest_requests_total counter"
+        ]
+        for name, endpoint in self.endpoints.items():
+            for status, count in sorted(endpoint.statuses.items()):
+                lines.append(f'beeharvest_requests_total{{endpoint="{name}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP beeharvest_request_duration_seconds Request latency including the response body.",
+            "# TYPE beeharvest_request_duration_seconds histogram"
+        ]
+        for name, endpoint in self.endpoints.items():
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], endpoint.buckets):
+                cumulative += count
+                lines.append(f'beeharvest_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'beeharvest_request_duration_seconds_sum{{endpoint="{name}"}} {endpoint.latency_sum:.6f}')
+            lines.append(f'beeharvest_request_duration_seconds_count{{endpoint="{name}"}} {endpoint.requests}')
+
+        for metric, help_text, attribute in (
+            ("beeharvest_response_bytes_total", "Response body bytes received.", "bytes"),
+            ("beeharvest_retries_total", "Requests retried after a failure.", "retries")
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for name, endpoint in self.endpoints.items():
+                lines.append(f'{metric}{{endpoint="{name}"}} {getattr(endpoint, attribute)}')
+
+        lines += [
+            "# HELP beeharvest_json_decode_seconds_total Time spent decoding response bodies.",
+            "# TYPE beeharvest_json_decode_seconds_total counter",
+            f"beeharvest_json_decode_seconds_total {self.decode_seconds:.6f}"
+        ]
+
+        for metric, help_text, attribute in (
+            ("beeharvest_account_requests_total", "Requests sent per account.", "requests"),
+            ("beeharvest_account_response_bytes_total", "Response body bytes received per account.", "bytes"),
+            ("beeharvest_account_retries_total", "Requests retried per account.", "retries")
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for key, account in self.accounts.items():
+                lines.append(f'{metric}{{account="{key}"}} {getattr(account, attribute)}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt="json"):
+        content = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+    async def serve(self, host="127.0.0.1", port=9100):
+        async def prometheus(request):
+            return web.Response(text=self.to_prometheus(), content_type="text/plain")
+
+        async def json_dump(request):
+            return web.Response(text=self.to_json(), content_type="application/json")
+
+        app = web.Application()
+        app.router.add_get("/metrics", prometheus)
+        app.router.add_get("/metrics.json", json_dump)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
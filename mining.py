@@ -0,0 +1,108 @@
+class UpgradeTable:
+    def __init__(self, store=None, probe_margin=2):
+        self.store = store
+        self.probe_margin = probe_margin
+        # (component, level) -> (price paid to reach the level, yield at the level)
+        self.levels = store.load() if store else {}
+        # (component, level) -> highest balance the server refused for the level
+        self.floors = store.load_floors() if store else {}
+
+    def learn(self, component, level, price=None, level_yield=None):
+        if level is None:
+            return
+        level = int(level)
+        old_price, old_yield = self.levels.get((component, level), (None, None))
+        price = old_price if price is None else float(price)
+        level_yield = old_yield if level_yield is None else float(level_yield)
+        if (price, level_yield) == (old_price, old_yield):
+            return
+        self.levels[(component, level)] = (price, level_yield)
+        if self.store:
+            self.store.save(component, level, price, level_yield)
+
+    def learn_floor(self, component, level, balance):
+        # an "insufficient funds" answer only tells us the price is above the balance
+        if level is None or balance <= self.floors.get((component, level), float("-inf")):
+            return
+        self.floors[(component, level)] = balance
+        if self.store:
+            self.store.save_floor(component, level, balance)
+
+    def learn_mining(self, mining):
+        for component, info in mining.items():
+            if not isinstance(info, dict) or info.get("level") is None:
+                continue
+            self.learn(component, info["level"], level_yield=info.get("yield"))
+            self.learn(component, info["level"] + 1, info.get("next_level_price"), info.get("next_level_yield"))
+
+    def learn_upgrade(self, component, result):
+        current = result.get("current") or {}
+        if current.get("level") is None:
+            return
+        self.learn(component, current["level"], current.get("price"), current.get("yield"))
+        self.learn(component, current["level"] + 1, current.get("next_level_price"))
+
+    def price(self, component, level):
+        return self.levels.get((component, level), (None, None))[0]
+
+    def floor(self, component, level):
+        return self.floors.get((component, level))
+
+    def gain(self, component, level):
+        # yield added by reaching level, falling back to the closest step seen below it
+        for known in range(level, 1, -1):
+            above = self.levels.get((component, known), (None, None))[1]
+            below = self.levels.get((component, known - 1), (None, None))[1]
+            if above is not None and below is not None:
+                return above - below
+        return 0.0
+
+    def plan(self, levels, balance, max_levels):
+        # greedy by yield per token, only upgrades with a known price that the balance covers
+        levels = dict(levels)
+        plan = []
+        while True:
+            best = None
+            for component, max_level in max_levels.items():
+                level = levels.get(component)
+                if level is None or level >= max_level:
+                    continue
+                price = self.price(component, level + 1)
+                if price is None or price > balance:
+                    continue
+                ratio = self.gain(component, level + 1) / price if price else float("inf")
+                if best is None or (ratio, -price) > best[0]:
+                    best = ((ratio, -price), component, price)
+            if best is None:
+                return plan
+
+            _, component, price = best
+            levels[component] += 1
+            balance -= price
+            plan.append((component, levels[component], price))
+
+    def cheapest(self, levels, max_levels):
+        # only real prices, a refused balance says nothing about when the upgrade becomes affordable
+        prices = [
+            self.price(component, levels[component] + 1)
+            for component, max_level in max_levels.items()
+            if levels.get(component) is not None and levels[component] < max_level
+        ]
+        prices = [price for price in prices if price is not None]
+        return min(prices) if prices else None
+
+    def unknown(self, levels, max_levels, balance):
+        # components whose next price has never been seen, probed again only once the balance has grown
+        # well past the one they were refused at, a component at an unknown level is left alone since
+        # max_level could not be held
+        if balance <= 0:
+            return []
+        unknown = []
+        for component, max_level in max_levels.items():
+            level = levels.get(component)
+            if level is None or level >= max_level or self.price(component, level + 1) is not None:
+                continue
+            floor = self.floor(component, level + 1)
+            if floor is None or balance >= floor * self.probe_margin:
+                unknown.append(component)
+        return unknown
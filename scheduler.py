@@ -0,0 +1,328 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from colorama import Fore, Style
+from loguru import logger
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    # full jitter keeps retries from many accounts from landing together
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class HostBudget:
+    def __init__(self, rate, burst):
+        self.rate = rate or None
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_pushback = 0.0
+        self.last_decrease = 0.0
+        self.feedback_start = self.updated
+        self.responses = 0
+        self.failures = 0
+        self.window_start = self.updated
+        self.window_count = 0
+        self.recent_rate = 0.0
+        self.lock = asyncio.Lock()
+
+    def count_request(self, now):
+        if now - self.window_start >= 1:
+            self.recent_rate = self.window_count / (now - self.window_start)
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+
+
+class RateBudget:
+    def __init__(self, rate, burst=1, min_rate=0.5, increase=1.25, recovery=60, failure_ratio=0.1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min_rate
+        self.increase = increase
+        self.failure_ratio = failure_ratio
+        self.recovery = recovery
+        self.pushbacks = 0
+        self._hosts = {}
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = HostBudget(self.rate, self.burst)
+        return self._hosts[host]
+
+    def current_rate(self, host):
+        return self._host(host).rate
+
+    async def acquire(self, host):
+        budget = self._host(host)
+        now = time.monotonic()
+        budget.count_request(now)
+        # no limit and no pushback: nothing to wait for
+        if budget.rate is None and budget.blocked_until <= now:
+            return
+
+        async with budget.lock:
+            now = time.monotonic()
+            if budget.blocked_until > now:
+                await asyncio.sleep(budget.blocked_until - now)
+                now = time.monotonic()
+            if budget.rate is None:
+                return
+
+            tokens = min(self.burst, budget.tokens + (now - budget.updated) * budget.rate)
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / budget.rate)
+                now = time.monotonic()
+                tokens = 1
+
+            budget.tokens = tokens - 1
+            budget.updated = now
+
+    def record(self, host, status, retry_after=None):
+        budget = self._host(host)
+        now = time.monotonic()
+        budget.responses += 1
+
+        # a 503 with Retry-After is pushback as explicit as a 429
+        delay = parse_retry_after(retry_after) if status == 429 or status >= 500 else None
+        if delay:
+            budget.blocked_until = max(budget.blocked_until, now + delay)
+        if status == 429 or delay:
+            self._slow_down(host, budget, now, status)
+        elif status == 0 or status >= 500:
+            budget.failures += 1
+
+        if now - budget.feedback_start < 1:
+            return
+
+        # judge 5xx by their share of a one second window, a few stray errors are not overload
+        if budget.failures > max(1, budget.responses * self.failure_ratio):
+            self._slow_down(host, budget, now, f"{budget.failures} failures")
+        elif budget.rate is not None and now - budget.last_pushback >= 1:
+            if self.rate:
+                budget.rate = min(self.rate, budget.rate * self.increase)
+            elif now - budget.last_pushback >= self.recovery:
+                budget.rate = None
+            else:
+                budget.rate *= self.increase
+        budget.feedback_start = now
+        budget.responses = 0
+        budget.failures = 0
+
+    def _slow_down(self, host, budget, now, reason):
+        budget.last_pushback = now
+        # halve at most once a second so a burst of failures counts as one signal
+        if now - budget.last_decrease < 1:
+            return
+        budget.last_decrease = now
+        self.pushbacks += 1
+        current = budget.rate or max(self.min_rate, budget.recent_rate, budget.window_count)
+        budget.rate = max(self.min_rate, current / 2)
+        budget.tokens = min(budget.tokens, 1)
+        budget.updated = now
+        logger.warning(f"{Fore.YELLOW}{host} is pushing back ({reason}) - "
+                       f"slowing to {budget.rate:.1f} requests/s{Style.RESET_ALL}")
+
+
+class CycleStats:
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def wall_time(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def accounts_per_minute(self):
+        if self.wall_time <= 0:
+            return 0.0
+        return self.processed * 60 / self.wall_time
+
+    def __str__(self):
+        return (f"{self.processed} accounts in {self.wall_time:.1f}s "
+                f"({self.accounts_per_minute:.1f} accounts/min, {self.failed} failed)")
+
+
+class Visit:
+    def __init__(self, account):
+        self.account = account
+        self.started = time.time()
+        self.balance = None
+        self.spins = None
+        self.end_balance = None
+        self.end_spins = 0
+        self.upgrade_price = None
+        self.deadlines = []
+
+
+class WakePlanner:
+    def __init__(self, min_interval=60, max_interval=1800, jitter=0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def next_wake(self, visit):
+        now = time.time()
+        wake = now + self.max_interval
+        for deadline in visit.deadlines:
+            if deadline is not None:
+                wake = min(wake, deadline)
+
+        # the account keeps time, balance and spins from the end of its previous visit
+        account = visit.account
+        elapsed = visit.started - account.seen_at if account.seen_at else 0
+        if elapsed > 0:
+            # balance and spins grow between visits, their rate tells when the next upgrade or spin is there
+            if visit.balance is not None and account.balance is not None and visit.upgrade_price is not None:
+                income = (visit.balance - account.balance) / elapsed
+                if income > 0:
+                    wake = min(wake, now + max(0.0, visit.upgrade_price - (visit.end_balance or 0)) / income)
+            if visit.spins is not None:
+                refill = (visit.spins - account.spins) / elapsed
+                if refill > 0:
+                    wake = min(wake, now + 1 / refill)
+
+        account.seen_at, account.balance, account.spins = now, visit.end_balance, visit.end_spins
+        # a little spread keeps accounts that became due together from staying in lockstep
+        wake = max(now + self.min_interval, wake)
+        return wake + (wake - now) * random.uniform(0, self.jitter)
+
+
+class DeadlineScheduler:
+    def __init__(self, handler, workers=5, default_interval=1800, store=None, key=None):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.default_interval = default_interval
+        # due times survive a restart when a store is given, keyed by key(account)
+        self.store = store
+        self.key = key or (lambda account: account)
+        self.saved = store.load() if store else {}
+        self.accounts = set()
+        self.heap = []
+        self.stats = CycleStats()
+        self._order = itertools.count()
+        # made in run(): before Python 3.10 an Event binds to the loop current when it is created
+        self._changed = None
+        self._aborted = None
+        self._stopping = False
+
+    def schedule(self, account, due):
+        heapq.heappush(self.heap, (due, next(self._order), account))
+        if self._changed is not None:
+            self._changed.set()
+
+    def stop(self):
+        # no new accounts are dispatched, run() returns once the ones in flight are done
+        self._stopping = True
+        if self._changed is not None:
+            self._changed.set()
+
+    @property
+    def stopping(self):
+        return self._stopping
+
+    async def sync(self, accounts):
+        # new accounts are due right away unless a saved due time says otherwise, removed ones are dropped
+        current = set()
+        async for account in accounts:
+            current.add(account)
+        now = time.time()
+        for account in current - self.accounts:
+            self.schedule(account, min(self.saved.pop(self.key(account), now), now + self.default_interval))
+        self.accounts = current
+        self.heap = [entry for entry in self.heap if entry[2] in current]
+        heapq.heapify(self.heap)
+        return len(current)
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    async def run(self, until, grace=30):
+        # dispatch due accounts until `until` or stop(), then give the ones in flight `grace` seconds
+        # to finish and return the stats
+        queue = asyncio.Queue(maxsize=self.workers)
+        self._changed = asyncio.Event()
+
+        async def work():
+            while True:
+                account = await queue.get()
+                due = None
+                try:
+                    due = await self.handler(account)
+                    self.stats.processed += 1
+                except SystemExit as e:
+                    self._aborted = str(e)
+                    self._changed.set()
+                except Exception as e:
+                    self.stats.failed += 1
+                    logger.error(f"{Fore.RED}Account failed: {str(e)}{Style.RESET_ALL}")
+                except asyncio.CancelledError:
+                    # cut off by a shutdown: the account keeps its old due time and resumes on restart
+                    queue.task_done()
+                    raise
+                if account in self.accounts:
+                    due = due or time.time() + self.default_interval
+                    self.schedule(account, due)
+                    if self.store:
+                        self.store.set_due(self.key(account), due)
+                queue.task_done()
+
+        workers = [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            while self._aborted is None and not self._stopping:
+                now = time.time()
+                if now >= until:
+                    break
+                if self.heap and self.heap[0][0] <= now:
+                    _, _, account = heapq.heappop(self.heap)
+                    await queue.put(account)
+                    continue
+
+                # one sleep until the earliest deadline, an idle pool costs nothing in between
+                self._changed.clear()
+                timeout = min(until, self.next_due() or until) - now
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            if self._stopping:
+                # accounts still waiting in the queue were never started and stay due
+                while not queue.empty():
+                    self.schedule(queue.get_nowait(), time.time())
+                    queue.task_done()
+                try:
+                    await asyncio.wait_for(queue.join(), grace)
+                except asyncio.TimeoutError:
+                    logger.warning(f"{Fore.YELLOW}Shutdown grace of {grace}s expired - interrupting accounts in flight{Style.RESET_ALL}")
+            else:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        if self._aborted is not None:
+            raise SystemExit(self._aborted)
+        stats, self.stats = self.stats, CycleStats()
+        stats.finished = time.monotonic()
+        return stats
@@ -0,0 +1,43 @@
+def plan_spin_batches(spin_count, batch_sizes):
+    # fewest batches that add up to spin_count, smaller sizes only fill what larger ones leave
+    sizes = sorted({size for size in batch_sizes if size > 0}, reverse=True)
+    fewest = [0] + [None] * spin_count
+    choice = [0] * (spin_count + 1)
+    for total in range(1, spin_count + 1):
+        for size in sizes:
+            if size > total or fewest[total - size] is None:
+                continue
+            if fewest[total] is None or fewest[total - size] + 1 < fewest[total]:
+                fewest[total] = fewest[total - size] + 1
+                choice[total] = size
+
+    # without a batch of one some spins may have to stay unused
+    total = spin_count
+    while total > 0 and fewest[total] is None:
+        total -= 1
+
+    plan = []
+    while total > 0:
+        plan.append(choice[total])
+        total -= choice[total]
+    return sorted(plan, reverse=True)
+
+
+class SpinSummary:
+    def __init__(self):
+        self.spins = 0
+        self.batches = 0
+        self.rewards = {}
+
+    def add(self, batch_size, rewards):
+        self.spins += batch_size
+        self.batches += 1
+        for reward in rewards or []:
+            reward_type = reward.get("type", "unknown")
+            count, value = self.rewards.get(reward_type, (0, 0))
+            self.rewards[reward_type] = (count + reward.get("count", 0), value + reward.get("value", 0))
+
+    def __str__(self):
+        rewards = ", ".join(f"{count}x {reward_type} (value: {value})"
+                            for reward_type, (count, value) in sorted(self.rewards.items()))
+        return f"{self.spins} spins in {self.batches} batches | {rewards or 'no rewards'}"
@@ -0,0 +1,40 @@
+import time
+
+
+class StakePolicy:
+    def __init__(self, action_store, min_amount=0, min_interval=0):
+        self.action_store = action_store
+        self.min_amount = min_amount
+        self.min_interval = min_interval
+        self.reset()
+
+    def reset(self):
+        self.stakes = 0
+        self.staked = 0.0
+        self.avoided = 0
+
+    def due(self, key, balance):
+        # balances are left to grow into one larger stake instead of a POST for every bit of dust
+        if balance <= 0:
+            return False
+        if balance < self.min_amount or not self.action_store.due(key, "stake"):
+            self.avoided += 1
+            return False
+        return True
+
+    def next_at(self, key, balance):
+        # an account held back only by the interval has its stake waiting when the interval ends
+        if balance > 0 and balance >= self.min_amount:
+            return self.action_store.next_at(key, "stake")
+        return None
+
+    def done(self, key, amount):
+        self.stakes += 1
+        self.staked += amount
+        self.action_store.done(key, "stake", time.time() + self.min_interval)
+
+    def average(self):
+        return self.staked / self.stakes if self.stakes else 0.0
+
+    def __str__(self):
+        return f"{self.stakes} stakes averaging {self.average():.5f} tokens, {self.avoided} avoided below the threshold or interval"
@@ -0,0 +1,214 @@
+import base64
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+
+
+def account_key(user_data):
+    return hashlib.sha256(user_data.encode()).hexdigest()
+
+
+def connect(path, timeout=30):
+    # shard processes share the file, WAL plus a busy timeout lets their writes queue up instead of failing
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class TokenStore:
+    def __init__(self, path, default_ttl=3600, expiry_margin=60):
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin
+        self.conn = connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "account_key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.tokens = {
+            sys.intern(key): (token, expires_at)
+            for key, token, expires_at in self.conn.execute("SELECT account_key, token, expires_at FROM tokens")
+        }
+
+    def get(self, key):
+        entry = self.tokens.get(key)
+        if not entry:
+            return None
+        token, expires_at = entry
+        if expires_at - self.expiry_margin <= time.time():
+            return None
+        return token
+
+    def set(self, key, token):
+        expires_at = self.token_expiry(token) or time.time() + self.default_ttl
+        self.tokens[key] = (token, expires_at)
+        self.conn.execute("INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)", (key, token, expires_at))
+        self.conn.commit()
+
+    def invalidate(self, key):
+        if self.tokens.pop(key, None):
+            self.conn.execute("DELETE FROM tokens WHERE account_key = ?", (key,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def token_expiry(token):
+        # JWT payloads carry their own expiry, anything else falls back to the default TTL
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            return float(exp) if exp else None
+        except (IndexError, ValueError, TypeError, AttributeError):
+            return None
+
+
+class SignatureStore:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS endpoint_structures ("
+            "endpoint TEXT PRIMARY KEY, signature TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def load(self):
+        return dict(self.conn.execute("SELECT endpoint, signature FROM endpoint_structures"))
+
+    def save(self, endpoint, signature):
+        self.conn.execute("INSERT OR REPLACE INTO endpoint_structures VALUES (?, ?)", (endpoint, signature))
+        self.conn.commit()
+
+    def clear(self):
+        # the next response of every endpoint is taken as its structure again, tokens and actions stay
+        count = self.conn.execute("DELETE FROM endpoint_structures").rowcount
+        self.conn.commit()
+        return count
+
+    def close(self):
+        self.conn.close()
+
+
+class UpgradeCostStore:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS upgrade_costs ("
+            "component TEXT NOT NULL, level INTEGER NOT NULL, price REAL, yield REAL, "
+            "PRIMARY KEY (component, level))"
+        )
+        # balances that were refused a level, its price lies above them
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS upgrade_floors ("
+            "component TEXT NOT NULL, level INTEGER NOT NULL, floor REAL NOT NULL, "
+            "PRIMARY KEY (component, level))"
+        )
+        self.conn.commit()
+
+    def load(self):
+        return {
+            (component, level): (price, level_yield)
+            for component, level, price, level_yield in self.conn.execute(
+                "SELECT component, level, price, yield FROM upgrade_costs"
+            )
+        }
+
+    def save(self, component, level, price, level_yield):
+        self.conn.execute("INSERT OR REPLACE INTO upgrade_costs VALUES (?, ?, ?, ?)", (component, level, price, level_yield))
+        self.conn.commit()
+
+    def load_floors(self):
+        return {
+            (component, level): floor
+            for component, level, floor in self.conn.execute("SELECT component, level, floor FROM upgrade_floors")
+        }
+
+    def save_floor(self, component, level, floor):
+        self.conn.execute("INSERT OR REPLACE INTO upgrade_floors VALUES (?, ?, ?)", (component, level, floor))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def next_daily_reset(now=None, reset_hour=0):
+    now = time.time() if now is None else now
+    reset = now // 86400 * 86400 + reset_hour * 3600
+    return reset if reset > now else reset + 86400
+
+
+class ActionStore:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS account_actions ("
+            "account_key TEXT NOT NULL, action TEXT NOT NULL, done_at REAL NOT NULL, next_at REAL, "
+            "PRIMARY KEY (account_key, action))"
+        )
+        self.conn.commit()
+        # next_at of None means a one-time action that never comes back
+        # keys and action names are interned, 100k accounts with a dozen actions each share the strings
+        self.actions = {
+            (sys.intern(key), sys.intern(action)): next_at
+            for key, action, next_at in self.conn.execute("SELECT account_key, action, next_at FROM account_actions")
+        }
+
+    def due(self, key, action):
+        if (key, action) not in self.actions:
+            return True
+        next_at = self.actions[(key, action)]
+        return next_at is not None and next_at <= time.time()
+
+    def next_at(self, key, action):
+        return self.actions.get((key, action))
+
+    def done(self, key, action, next_at=None):
+        self.actions[(key, sys.intern(action))] = next_at
+        self.conn.execute("INSERT OR REPLACE INTO account_actions VALUES (?, ?, ?, ?)", (key, action, time.time(), next_at))
+        self.conn.commit()
+
+    def reset(self, key, action):
+        if self.actions.pop((key, action), False) is not False:
+            self.conn.execute("DELETE FROM account_actions WHERE account_key = ? AND action = ?", (key, action))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class ScheduleStore:
+    def __init__(self, path):
+        self.conn = connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS account_schedule ("
+            "account_key TEXT PRIMARY KEY, due_at REAL NOT NULL, step TEXT)"
+        )
+        self.conn.commit()
+
+    def load(self):
+        return dict(self.conn.execute("SELECT account_key, due_at FROM account_schedule"))
+
+    def steps(self):
+        return dict(self.conn.execute("SELECT account_key, step FROM account_schedule WHERE step IS NOT NULL"))
+
+    def set_due(self, key, due_at):
+        # a finished visit has nothing left to resume
+        self.conn.execute("INSERT OR REPLACE INTO account_schedule VALUES (?, ?, NULL)", (key, due_at))
+        self.conn.commit()
+
+    def save_steps(self, steps):
+        # interrupted visits are due again right away and pick up after their last finished step
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO account_schedule VALUES (?, ?, ?)",
+            [(key, now, step) for key, step in steps.items()]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+import queue
+from collections import Counter
+
+from colorama import Fore, Style
+from loguru import logger
+
+from metrics import Metrics
+
+
+class ShardSupervisor:
+    def __init__(self, target, count, metrics_config):
+        self.target = target
+        self.count = count
+        self.metrics_config = metrics_config
+        self.reports = multiprocessing.Queue()
+        self.processes = []
+        self.metrics = Metrics()
+        # latest cumulative metrics per shard for the metrics file, round totals and requests since the last summary
+        self.latest = {}
+        self.rounds = {}
+        self.summaries = 0
+
+    def start(self):
+        for index in range(self.count):
+            process = multiprocessing.Process(target=self.target, args=(index, self.count, self.reports), name=f"shard-{index}")
+            process.start()
+            self.processes.append(process)
+        logger.info(f"Started {self.count} shard processes")
+
+    async def run(self):
+        if self.metrics_config["port"]:
+            await self.metrics.serve(port=self.metrics_config["port"])
+            logger.info(f"Metrics available at http://127.0.0.1:{self.metrics_config['port']}/metrics")
+
+        loop = asyncio.get_running_loop()
+        try:
+            # a shard that exits cleanly is left alone, only a crashed one takes the others down
+            while any(process.is_alive() for process in self.processes) and not self.failed():
+                try:
+                    report = await loop.run_in_executor(None, self.reports.get, True, 1)
+                except queue.Empty:
+                    continue
+                self.collect(report)
+
+            failed = self.failed()
+            if failed:
+                logger.error(f"{Fore.RED}{', '.join(failed)} stopped - shutting down the other shards{Style.RESET_ALL}")
+        finally:
+            self.stop()
+
+    def failed(self):
+        return [process.name for process in self.processes if process.exitcode not in (None, 0)]
+
+    def collect(self, report):
+        shard = report["shard"]
+        self.latest[shard] = report["metrics"]
+        totals = self.rounds.setdefault(shard, Counter())
+        totals.update(report["totals"])
+        self.metrics.merge_cycle(report["cycle"])
+        if len(self.rounds) < sum(process.is_alive() for process in self.processes):
+            return
+
+        # every shard has reported since the last summary
+        self.summaries += 1
+        totals = sum(self.rounds.values(), Counter())
+        self.rounds = {}
+        logger.info(f"Round #{self.summaries} across {self.count} shards: {totals['processed']} accounts "
+                    f"({totals['failed']} failed), {totals['requests_saved']} requests saved by snapshots, "
+                    f"{totals['actions_skipped']} actions skipped, "
+                    f"task checks {totals['tasks_issued']} issued / {totals['tasks_skipped']} skipped, "
+                    f"{totals['stakes']} stakes averaging {totals['staked'] / max(1, totals['stakes']):.5f} tokens / "
+                    f"{totals['stakes_avoided']} avoided")
+
+        self.metrics.endpoints = {}
+        self.metrics.accounts = {}
+        self.metrics.decode_seconds = 0.0
+        for snapshot in self.latest.values():
+            self.metrics.merge(snapshot)
+        for line in self.metrics.summary_table():
+            logger.info(line)
+        self.metrics.start_cycle()
+        if self.metrics_config["file"]:
+            self.metrics.write(self.metrics_config["file"], self.metrics_config["format"])
+
+    def stop(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+
+class TaskCatalog:
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.tasks = None
+        self.fetched_at = 0.0
+        self.fetches = 0
+        # made in get(): before Python 3.10 a Lock binds to the loop current when it is created
+        self._lock = None
+
+    def fresh(self):
+        return self.tasks is not None and time.monotonic() - self.fetched_at < self.ttl
+
+    async def get(self, fetch):
+        # task definitions are the same for every account, so one fetch serves the whole pool
+        if self.fresh():
+            return self.tasks
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.fresh():
+                tasks = await fetch()
+                if tasks is None:
+                    return self.tasks or []
+
+                unique = {}
+                for task in tasks:
+                    unique.setdefault(task.get("id"), task)
+                self.tasks = list(unique.values())
+                self.fetched_at = time.monotonic()
+                self.fetches += 1
+        return self.tasks
+
+    def invalidate(self):
+        self.tasks = None